@@ -0,0 +1,133 @@
+"""Sparse candidate edges for spanning trees over point layers.
+
+The Euclidean minimum spanning tree of a set of points is always a subgraph
+of their Delaunay triangulation, which has O(n) edges. Candidate edges are
+built on the triangulation, so a spanning tree over them is exact, and can be
+topped up with k-nearest and within-radius neighbours from a KD-tree.
+"""
+import numpy
+from scipy.spatial import cKDTree, Delaunay, QhullError
+
+
+def delaunay_edges(coords):
+    """Unique edges of the Delaunay triangulation of 2D points.
+
+    Parameters
+    ----------
+    coords : array_like
+        Point coordinates, shape ``(n, 2)``.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        ``u`` and ``v`` point indices with ``u < v``.
+
+    Raises
+    ------
+    scipy.spatial.QhullError
+        If the points cannot be triangulated (fewer than three, or all
+        collinear).
+
+    """
+    tri = Delaunay(numpy.asarray(coords, dtype=numpy.float64))
+    simplices = tri.simplices
+    pairs = [simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]]
+
+    # coincident points are left out of the triangulation; tie each one to
+    # the vertex it coincides with
+    if len(tri.coplanar):
+        pairs.append(tri.coplanar[:, [0, 2]])
+
+    return unique_pairs(numpy.concatenate(pairs))
+
+
+def complete_edges(n):
+    """All ``n * (n - 1) / 2`` edges between ``n`` points, as ``u``, ``v``.
+    """
+    return numpy.triu_indices(n, k=1)
+
+
+def candidate_edges(coords, k=None, radius=None):
+    """Candidate edges for a spanning tree over points.
+
+    Always includes the Delaunay edges, so the minimum spanning tree over the
+    candidates is the exact Euclidean minimum spanning tree. Falls back to the
+    complete graph only when the points cannot be triangulated.
+
+    Parameters
+    ----------
+    coords : array_like
+        Point coordinates, shape ``(n, 2)``.
+    k : int, optional
+        Also link each point to its ``k`` nearest neighbours.
+    radius : float, optional
+        Also link every pair of points closer than ``radius``.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        ``u`` and ``v`` point indices with ``u < v``, each pair once.
+
+    """
+    coords = numpy.asarray(coords, dtype=numpy.float64)
+    n = len(coords)
+    if n < 2:
+        return complete_edges(n)
+
+    try:
+        pairs = [numpy.column_stack(delaunay_edges(coords))]
+    except QhullError:
+        # too few or collinear points: nothing sparser is guaranteed exact
+        return complete_edges(n)
+
+    if not k and radius is None:
+        return pairs[0][:, 0], pairs[0][:, 1]
+
+    # one spatial index for both neighbour queries
+    tree = cKDTree(coords)
+
+    if k:
+        _, neighbours = tree.query(coords, k=min(k + 1, n))
+        sources = numpy.repeat(numpy.arange(n), neighbours.shape[1])
+        pairs.append(numpy.column_stack((sources, neighbours.ravel())))
+
+    if radius is not None:
+        pairs.append(tree.query_pairs(radius, output_type='ndarray'))
+
+    return unique_pairs(numpy.concatenate(pairs))
+
+
+def unique_pairs(pairs):
+    """Deduplicate undirected index pairs and drop self-loops.
+
+    Parameters
+    ----------
+    pairs : numpy.ndarray
+        Index pairs, shape ``(m, 2)``.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        ``u`` and ``v`` with ``u < v``, sorted.
+
+    """
+    pairs = numpy.asarray(pairs, dtype=numpy.int64).reshape(-1, 2)
+    u = numpy.minimum(pairs[:, 0], pairs[:, 1])
+    v = numpy.maximum(pairs[:, 0], pairs[:, 1])
+    keep = u != v
+    u, v = u[keep], v[keep]
+    if not len(u):
+        return u, v
+
+    # one int64 key per pair is much faster to deduplicate than rows
+    n = v.max() + 1
+    keys = numpy.unique(u * n + v)
+    return keys // n, keys % n
+
+
+def edge_lengths(coords, u, v):
+    """Euclidean length of each edge ``(u[i], v[i])`` between points.
+    """
+    coords = numpy.asarray(coords, dtype=numpy.float64)
+    delta = coords[u] - coords[v]
+    return numpy.hypot(delta[:, 0], delta[:, 1])
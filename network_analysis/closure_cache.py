@@ -0,0 +1,157 @@
+"""Memory-mapped on-disk cache of metric closure rows.
+
+Each cached row is a complete single-source shortest path result over one
+graph: a float64 distance to every node, and an int32 predecessor array in
+the layout used by ``steiner.MetricClosure``. Rows are stored in batches of
+``.npy`` files under a directory named by a fingerprint of the graph's
+nodes, edges and weights. A changed graph gets a new fingerprint and never
+sees stale rows. Later runs map the files in with ``mmap_mode='r'``, so
+cached rows are not copied into memory, and only sources not already
+cached are computed.
+
+Whole graph directories are evicted least recently used first once the
+cache grows past ``max_bytes``.
+"""
+import glob
+import hashlib
+import os
+import shutil
+import uuid
+
+import numpy
+
+
+class ClosureCache(object):
+    """Cache of shortest path rows, keyed by graph fingerprint.
+
+    Parameters
+    ----------
+    directory : str
+        Root directory for the cache, created if missing.
+    max_bytes : int, optional
+        Size cap for the whole cache. No cap if not given.
+
+    """
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(G, weight='weight'):
+        """Hash of a graph's node order, edges and edge weights.
+        """
+        digest = hashlib.sha256()
+        digest.update(repr((G.is_directed(), weight)).encode())
+        for node in G:
+            digest.update(repr(node).encode())
+            digest.update(b'\0')
+        for u, v, w in G.edges(data=weight, default=1):
+            digest.update(repr((u, v, w)).encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def rows(self, key):
+        """Cached rows for a graph fingerprint.
+
+        Returns
+        -------
+        dict
+            Source node position to ``(distance_row, pred_row)``, both views
+            into memory-mapped files.
+
+        """
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return {}
+        os.utime(path)  # mark as recently used
+
+        rows = {}
+        for sources_file in sorted(glob.glob(os.path.join(path, '*.sources.npy'))):
+            batch = sources_file[:-len('.sources.npy')]
+            sources = numpy.load(sources_file)
+            distance = numpy.load(batch + '.dist.npy', mmap_mode='r')
+            pred = numpy.load(batch + '.pred.npy', mmap_mode='r')
+            for k, source in enumerate(sources.tolist()):
+                rows[source] = (distance[k], pred[k])
+        return rows
+
+    def store(self, key, sources, distance, pred):
+        """Add a batch of rows for a graph fingerprint, then apply the size
+        cap.
+
+        Parameters
+        ----------
+        key : str
+            Graph fingerprint.
+        sources : array_like
+            Node positions of the sources, shape ``(k,)``.
+        distance : numpy.ndarray
+            ``(k, |V|)`` float64 distances.
+        pred : numpy.ndarray
+            ``(k, |V|)`` int32 predecessors.
+
+        """
+        path = self._path(key)
+        os.makedirs(path, exist_ok=True)
+
+        # write under temporary names and rename, so a reader never maps a
+        # partial file; the sources file goes last as it marks the batch
+        batch = os.path.join(path, 'batch-' + uuid.uuid4().hex)
+        arrays = (
+            ('.dist.npy', numpy.asarray(distance, dtype=numpy.float64)),
+            ('.pred.npy', numpy.asarray(pred, dtype=numpy.int32)),
+            ('.sources.npy', numpy.asarray(sources, dtype=numpy.int64)),
+        )
+        for suffix, array in arrays:
+            with open(batch + suffix + '.tmp', 'wb') as f:
+                numpy.save(f, array)
+            os.replace(batch + suffix + '.tmp', batch + suffix)
+
+        os.utime(path)
+        self.evict(keep=key)
+
+    def size(self, key=None):
+        """Bytes on disk for one fingerprint, or for the whole cache.
+        """
+        paths = [self._path(key)] if key is not None else self._entries()
+        total = 0
+        for path in paths:
+            for name in os.listdir(path):
+                total += os.path.getsize(os.path.join(path, name))
+        return total
+
+    def _entries(self):
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if os.path.isdir(os.path.join(self.directory, name))
+        ]
+
+    def evict(self, keep=None):
+        """Remove least recently used graphs until the cache fits
+        ``max_bytes``. The graph ``keep`` is never removed.
+        """
+        if self.max_bytes is None:
+            return
+
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        sizes = {path: self.size(os.path.basename(path)) for path in entries}
+        total = sum(sizes.values())
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.basename(path) == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+    def clear(self, key=None):
+        """Remove one fingerprint's rows, or everything.
+        """
+        paths = [self._path(key)] if key is not None else self._entries()
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
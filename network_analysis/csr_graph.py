@@ -0,0 +1,200 @@
+"""Compressed sparse row (CSR) graphs for repeated shortest path queries.
+
+``compile_graph`` freezes a networkx graph once into three arrays: ``indptr``,
+``indices`` and float64 ``lengths``. After that, a search only follows list
+offsets. There are no adjacency dicts, no attribute dicts and no weight
+function calls per edge.
+
+``dijkstra`` is the early-exit multi-target search from
+``single_source_with_roads.shortest_path_tree``. It visits neighbours in the
+same order and breaks ties the same way, so it settles the same
+predecessors and gives the same trees. With ``engine='scipy'`` the same
+arrays go to ``scipy.sparse.csgraph.dijkstra`` instead. That search is
+compiled but cannot stop at the targets. It finds the same predecessors
+except where there are equal-length alternative paths.
+"""
+import time
+from heapq import heappush, heappop
+from itertools import count
+
+import numpy
+
+
+class CSRGraph(object):
+    """A graph as CSR arrays over nodes numbered ``0 .. n - 1``.
+
+    Attributes
+    ----------
+    nodes : list
+        Original node labels, by position.
+    index : dict
+        Node label to position.
+    indptr : numpy.ndarray
+        int64, neighbours of node ``i`` are ``indices[indptr[i]:indptr[i + 1]]``.
+    indices : numpy.ndarray
+        int32 neighbour positions.
+    lengths : numpy.ndarray
+        float64 edge lengths, aligned with ``indices``.
+
+    """
+    def __init__(self, nodes, indptr, indices, lengths):
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.indptr = numpy.asarray(indptr, dtype=numpy.int64)
+        self.indices = numpy.asarray(indices, dtype=numpy.int32)
+        self.lengths = numpy.asarray(lengths, dtype=numpy.float64)
+        # plain lists for the search loops, where element access on lists is
+        # much cheaper than on arrays
+        self._adjacency = (self.indptr.tolist(), self.indices.tolist(), self.lengths.tolist())
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+    def to_scipy(self):
+        """The graph as a scipy.sparse CSR matrix, built on first use.
+        """
+        if self._matrix is None:
+            from scipy.sparse import csr_matrix
+            n = len(self.nodes)
+            self._matrix = csr_matrix((self.lengths, self.indices, self.indptr), shape=(n, n))
+        return self._matrix
+
+
+def compile_graph(G, weight='length'):
+    """Freeze a networkx graph into a CSRGraph.
+
+    Neighbours keep their order in ``G``'s adjacency. Edges whose ``weight``
+    attribute is missing or None are left out, like edges ``shortest_path_tree``
+    skips.
+    """
+    nodes = list(G)
+    index = {node: i for i, node in enumerate(nodes)}
+    G_succ = G.succ if G.is_directed() else G.adj
+
+    indptr = [0]
+    indices = []
+    lengths = []
+    for v in nodes:
+        for u, e in G_succ[v].items():
+            cost = e.get(weight)
+            if cost is None:
+                continue
+            indices.append(index[u])
+            lengths.append(cost)
+        indptr.append(len(indices))
+
+    return CSRGraph(nodes, indptr, indices, lengths)
+
+
+def dijkstra(graph, source, targets=None, cutoff=None, engine='python'):
+    """Dijkstra over a CSRGraph, stopping once all targets are settled.
+
+    Parameters
+    ----------
+    graph : CSRGraph
+    source : int
+        Source position.
+    targets : iterable of int, optional
+        Target positions; search the whole graph if not given.
+    cutoff : float, optional
+        Do not settle nodes further than this.
+    engine : str, optional
+        ``'python'`` (default) or ``'scipy'``, see the module docstring.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        float64 distances (inf where not settled) and int32 predecessor
+        positions (-1 for the source and unreached nodes).
+
+    """
+    if engine == 'scipy':
+        return _scipy_dijkstra(graph, source, cutoff)
+    if engine != 'python':
+        raise ValueError("engine must be 'python' or 'scipy', not {!r}".format(engine))
+
+    indptr, indices, lengths = graph._adjacency
+    n = len(indptr) - 1
+
+    inf = float('inf')
+    dist = [inf] * n
+    settled = [False] * n
+    seen = [inf] * n
+    pred = [-1] * n
+
+    remaining = set(targets) if targets is not None else None
+    c = count()
+    seen[source] = 0
+    fringe = [(0, next(c), source)]
+
+    while fringe:
+        (d, _, v) = heappop(fringe)
+        if settled[v]:
+            continue  # already searched this node.
+        settled[v] = True
+        dist[v] = d
+        if remaining is not None:
+            remaining.discard(v)
+            if not remaining:
+                break  # stop if all reached
+
+        for k in range(indptr[v], indptr[v + 1]):
+            u = indices[k]
+            vu_dist = d + lengths[k]
+            if cutoff is not None and vu_dist > cutoff:
+                continue
+            if settled[u]:
+                if vu_dist < dist[u]:
+                    raise ValueError('Contradictory paths found:',
+                                     'negative weights?')
+            elif vu_dist < seen[u]:
+                seen[u] = vu_dist
+                pred[u] = v
+                heappush(fringe, (vu_dist, next(c), u))
+
+    return numpy.array(dist), numpy.array(pred, dtype=numpy.int32)
+
+
+def _scipy_dijkstra(graph, source, cutoff=None):
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+
+    dist, pred = csgraph_dijkstra(
+        graph.to_scipy(),
+        directed=True,  # both directions are already in the arrays
+        indices=source,
+        return_predecessors=True,
+        limit=numpy.inf if cutoff is None else cutoff
+    )
+    pred[pred < 0] = -1
+    return dist, pred.astype(numpy.int32)
+
+
+if __name__ == '__main__':
+    import networkx
+
+    # a road-like grid with about 1M edges and random lengths
+    side = 700
+    G = networkx.grid_2d_graph(side, side)
+    rng = numpy.random.default_rng(0)
+    for (u, v), length in zip(G.edges, rng.uniform(0.01, 0.1, G.number_of_edges())):
+        G.edges[u, v]['length'] = length
+    print('{} nodes, {} edges'.format(G.number_of_nodes(), G.number_of_edges()))
+
+    start = time.perf_counter()
+    compiled = compile_graph(G)
+    print('compile: {:.2f}s'.format(time.perf_counter() - start))
+
+    source = (side // 2, side // 2)
+    start = time.perf_counter()
+    networkx.single_source_dijkstra_path_length(G, source, weight='length')
+    print('networkx dijkstra: {:.2f}s'.format(time.perf_counter() - start))
+
+    for engine in ('python', 'scipy'):
+        start = time.perf_counter()
+        dijkstra(compiled, compiled.index[source], engine=engine)
+        print('csr dijkstra ({}): {:.2f}s'.format(engine, time.perf_counter() - start))
@@ -0,0 +1,315 @@
+"""Minimum spanning tree of a point layer, kept up to date as points come and go.
+
+Rebuilding the tree for every new premises repeats all the work. Two facts
+about Euclidean minimum spanning trees keep updates local:
+
+- Split the plane around a point into six 60 degree cones. Each of the
+  point's tree edges goes to the nearest other point in some cone. So a
+  point has at most six candidate edges, found in O(n) with NumPy.
+  Points at the same location have no direction from each other, so they
+  are left out of the cones and always linked directly.
+- Adding a point and its edges to a graph can only change its MST along
+  cycles through the new point (cycle property). Deleting a point splits
+  the tree into its components, which must then be rejoined by the
+  shortest edges between them.
+
+``insert`` adds the new point's cone edges one at a time, lightest first.
+For each edge it finds the heaviest edge on the tree path it would close
+and swaps them if the new edge is lighter. ``delete`` removes the point and
+its edges. It then finds the cone edges of every point outside the largest
+remaining piece, and joins the pieces with Kruskal over those edges. Every
+tree edge is a cone edge from both of its ends, so this misses none. When
+the smaller pieces hold many points, the candidate edges come from one
+Delaunay triangulation instead (see ``candidate_edges``).
+
+Weights are planar distances rounded to 4 places, as in
+``min_span_tree2.load_nodes``.
+"""
+import time
+from collections import deque
+
+import numpy
+
+from candidate_edges import candidate_edges, edge_lengths
+from euclidean_mst import euclidean_mst_from_coords
+from kruskal import DisjointSet
+from min_span_tree2 import Graph
+
+N_CONES = 6
+
+
+class DynamicMST(object):
+    """Euclidean minimum spanning tree with point insertion and deletion.
+
+    Parameters
+    ----------
+    ids : list, optional
+        Ids of the initial points.
+    coords : array_like, optional
+        ``(n, 2)`` coordinates of the initial points.
+
+    Attributes
+    ----------
+    tree : min_span_tree2.Graph
+        The current spanning tree.
+    max_cone_searches : int
+        Deletes that split off more points than this rejoin the pieces from
+        a Delaunay triangulation of all points instead of cone searches.
+
+    """
+    max_cone_searches = 64
+
+    def __init__(self, ids=(), coords=()):
+        ids = list(ids)
+        coords = numpy.asarray(coords, dtype=numpy.float64).reshape(-1, 2)
+
+        # point positions in a growing array, with removed points swapped
+        # out from the end so the live points are always _xy[:len(_ids)]
+        self._ids = []
+        self._index = {}
+        self._xy = numpy.empty((max(len(ids), 16), 2))
+        for point_id, xy in zip(ids, coords):
+            self._append(point_id, xy)
+
+        self.tree = Graph()
+        for point_id in ids:
+            self.tree.g.setdefault(point_id, {})
+        if len(ids) > 1:
+            for a, b, weight in euclidean_mst_from_coords(ids, coords):
+                self.tree.add(a, b, weight)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, point_id):
+        return point_id in self._index
+
+    def edges(self):
+        return self.tree.edges()
+
+    def total_weight(self):
+        return sum(weight for _, _, weight in self.tree)
+
+    def insert(self, point_id, xy):
+        """Add a point and repair the tree.
+
+        Returns
+        -------
+        tuple
+            Lists of ``(u, v, weight)`` tree edges added and removed.
+
+        """
+        if point_id in self._index:
+            raise ValueError('point {!r} is already in the tree'.format(point_id))
+
+        candidates = self._cone_edges(numpy.asarray(xy, dtype=numpy.float64))
+        self._append(point_id, xy)
+        self.tree.g.setdefault(point_id, {})
+
+        added = []
+        removed = []
+        for other, weight in sorted(candidates, key=lambda edge: edge[1]):
+            path = self._tree_path(point_id, other)
+            if path is None:
+                # not yet connected: the edge joins two pieces
+                self.tree.add(point_id, other, weight)
+                added.append((point_id, other, weight))
+                continue
+
+            a, b, heaviest = max(
+                ((a, b, self.tree[a][b]) for a, b in zip(path, path[1:])),
+                key=lambda edge: edge[2]
+            )
+            if weight < heaviest:
+                self.tree.remove(a, b)
+                removed.append((a, b, heaviest))
+                self.tree.add(point_id, other, weight)
+                added.append((point_id, other, weight))
+
+        return _net_changes(added, removed)
+
+    def delete(self, point_id):
+        """Remove a point and reconnect the pieces of the tree.
+
+        Returns
+        -------
+        tuple
+            Lists of ``(u, v, weight)`` tree edges added and removed.
+
+        """
+        removed = [(point_id, other, weight) for other, weight in self.tree[point_id].items()]
+        neighbours = [other for _, other, _ in removed]
+        self.tree.remove_vertex(point_id)
+        self._swap_remove(point_id)
+
+        if len(neighbours) < 2:
+            return [], removed
+
+        # label the pieces the tree fell into
+        piece = {}
+        sizes = []
+        for k, start in enumerate(neighbours):
+            members = self._component(start)
+            for member in members:
+                piece[member] = k
+            sizes.append(len(members))
+        largest = int(numpy.argmax(sizes))
+
+        outside = [member for member, k in piece.items() if k != largest]
+        if len(outside) <= self.max_cone_searches:
+            # every edge that rejoins the pieces starts from a point outside
+            # the largest piece, and is one of that point's cone edges
+            edges = []
+            for member in outside:
+                xy = self._xy[self._index[member]]
+                for other, weight in self._cone_edges(xy, exclude=member):
+                    if piece[other] != piece[member]:
+                        edges.append((weight, member, other))
+        else:
+            # too many points to search one at a time: take the crossing
+            # edges of the Delaunay triangulation, which holds the MST
+            edges = self._crossing_delaunay_edges(piece)
+        edges.sort(key=lambda edge: edge[0])
+
+        pieces = DisjointSet(len(neighbours))
+        added = []
+        for weight, a, b in edges:
+            if pieces.union(piece[a], piece[b]):
+                self.tree.add(a, b, weight)
+                added.append((a, b, weight))
+                if len(added) == len(neighbours) - 1:
+                    break
+
+        return added, removed
+
+    def _crossing_delaunay_edges(self, piece):
+        n = len(self._ids)
+        coords = self._xy[:n]
+        u, v = candidate_edges(coords)
+        weights = numpy.round(edge_lengths(coords, u, v), 4)
+        ids = self._ids
+        edges = []
+        for a, b, weight in zip(u.tolist(), v.tolist(), weights.tolist()):
+            if piece[ids[a]] != piece[ids[b]]:
+                edges.append((weight, ids[a], ids[b]))
+        return edges
+
+    def _append(self, point_id, xy):
+        n = len(self._ids)
+        if n == len(self._xy):
+            self._xy = numpy.concatenate((self._xy, numpy.empty_like(self._xy)))
+        self._xy[n] = xy
+        self._index[point_id] = n
+        self._ids.append(point_id)
+
+    def _swap_remove(self, point_id):
+        i = self._index.pop(point_id)
+        last = self._ids.pop()
+        if last != point_id:
+            self._xy[i] = self._xy[len(self._ids)]
+            self._ids[i] = last
+            self._index[last] = i
+
+    def _cone_edges(self, xy, exclude=None):
+        """Nearest live point to ``xy`` in each of six cones, as
+        ``(id, weight)`` pairs, plus every other point at ``xy`` itself.
+        """
+        n = len(self._ids)
+        delta = self._xy[:n] - xy
+        distance = numpy.hypot(delta[:, 0], delta[:, 1])
+        angle = numpy.arctan2(delta[:, 1], delta[:, 0])
+        cone = ((angle + numpy.pi) // (2 * numpy.pi / N_CONES)).astype(numpy.int64) % N_CONES
+        if exclude is not None:
+            distance[self._index[exclude]] = numpy.inf
+
+        # coincident points have no direction: link to all of them and keep
+        # them out of the cones, where they would hide the nearest real
+        # neighbour in whichever cone arctan2(0, 0) falls
+        coincident = numpy.flatnonzero(distance == 0)
+        edges = [(self._ids[i], 0.0) for i in coincident.tolist()]
+        distance[coincident] = numpy.inf
+
+        for c in range(N_CONES):
+            in_cone = numpy.flatnonzero(cone == c)
+            if not len(in_cone):
+                continue
+            nearest = in_cone[numpy.argmin(distance[in_cone])]
+            if numpy.isfinite(distance[nearest]):
+                edges.append((self._ids[nearest], round(float(distance[nearest]), 4)))
+        return edges
+
+    def _tree_path(self, source, target):
+        """Tree vertices from source to target, or None if not connected.
+        """
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            v = queue.popleft()
+            if v == target:
+                path = []
+                while v is not None:
+                    path.append(v)
+                    v = parent[v]
+                return path[::-1]
+            for u in self.tree[v]:
+                if u not in parent:
+                    parent[u] = v
+                    queue.append(u)
+        return None
+
+    def _component(self, start):
+        seen = {start}
+        stack = [start]
+        while stack:
+            v = stack.pop()
+            for u in self.tree[v]:
+                if u not in seen:
+                    seen.add(u)
+                    stack.append(u)
+        return seen
+
+
+def _net_changes(added, removed):
+    """Drop edges that were added and then removed again in one update.
+    """
+    added_keys = {frozenset((a, b)) for a, b, _ in added}
+    removed_keys = {frozenset((a, b)) for a, b, _ in removed}
+    return (
+        [edge for edge in added if frozenset(edge[:2]) not in removed_keys],
+        [edge for edge in removed if frozenset(edge[:2]) not in added_keys]
+    )
+
+
+def benchmark(n=20000, n_updates=200, seed=0):
+    """Time inserts and deletes against rebuilding the tree, and check the
+    tree weight matches a rebuild.
+    """
+    rng = numpy.random.default_rng(seed)
+    coords = rng.uniform(0, 1, (n, 2))
+    dynamic = DynamicMST(range(n), coords)
+
+    new = rng.uniform(0, 1, (n_updates, 2))
+    start = time.perf_counter()
+    for k, xy in enumerate(new):
+        dynamic.insert(n + k, xy)
+    insert_ms = (time.perf_counter() - start) / n_updates * 1e3
+
+    doomed = rng.choice(n, n_updates, replace=False)
+    start = time.perf_counter()
+    for point_id in doomed.tolist():
+        dynamic.delete(point_id)
+    delete_ms = (time.perf_counter() - start) / n_updates * 1e3
+
+    ids = list(dynamic._ids)
+    start = time.perf_counter()
+    rebuilt = euclidean_mst_from_coords(ids, dynamic._xy[:len(ids)])
+    rebuild_ms = (time.perf_counter() - start) * 1e3
+
+    expected = sum(weight for _, _, weight in rebuilt)
+    assert abs(dynamic.total_weight() - expected) < 1e-6, (dynamic.total_weight(), expected)
+    print('{} points: insert {:.2f} ms, delete {:.2f} ms, rebuild {:.0f} ms'.format(
+        n, insert_ms, delete_ms, rebuild_ms))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,311 @@
+"""Shortest path trees that follow edits to the road graph.
+
+When a road segment opens, closes or changes length, only sources whose
+trees use it (or could use it) need new trees, and only parts of those
+trees change. ``DynamicShortestPaths`` keeps the full single-source
+distances and predecessors of every source. On each edit it repairs them
+in the style of Ramalingam and Reps:
+
+- an edge getting shorter (or a new edge) can only shorten paths. A
+  Dijkstra search starts from the nearer end and relaxes outwards, stopping
+  wherever distances do not improve.
+- an edge getting longer (or removed) changes nothing unless it is a tree
+  edge. If it is, only the subtree hanging below it is affected. Those nodes
+  take their best distance through any unaffected neighbour, and a
+  Dijkstra search over the subtree settles the rest.
+
+Each edit returns, for every source, the sinks whose path changed, so only
+those trees need rebuilding downstream.
+"""
+import random
+import time
+from heapq import heappush, heappop
+from itertools import count
+
+import networkx
+
+INF = float('inf')
+
+
+class ShortestPathState(object):
+    """Distances and predecessors from one source over a whole graph.
+
+    Attributes
+    ----------
+    source : node
+    dist : dict
+        Node to shortest distance; unreachable nodes are missing.
+    pred : dict
+        Node to predecessor on its shortest path; None for the source.
+    children : dict
+        Node to the set of nodes whose predecessor it is.
+
+    """
+    def __init__(self, G, source, weight='length'):
+        self.source = source
+        self.weight = weight
+        # same search and tie-breaking as shortest_path_tree: the first
+        # predecessor found wins
+        preds, self.dist = networkx.dijkstra_predecessor_and_distance(
+            G, source, weight=_weight_function(weight))
+        self.pred = {node: (p[0] if p else None) for node, p in preds.items()}
+        self.children = {}
+        for node, parent in self.pred.items():
+            if parent is not None:
+                self.children.setdefault(parent, set()).add(node)
+
+    def _set_pred(self, node, parent):
+        old = self.pred.get(node)
+        if old is not None:
+            self.children[old].discard(node)
+        self.pred[node] = parent
+        if parent is not None:
+            self.children.setdefault(parent, set()).add(node)
+
+    def edge_decreased(self, G, u, v):
+        """Repair after the edge u-v was added or made shorter in G.
+
+        Returns
+        -------
+        set
+            Nodes whose shortest path changed.
+        """
+        length = G.edges[u, v].get(self.weight)
+        if length is None:
+            return set()
+
+        fringe = []
+        c = count()
+        for a, b in ((u, v), (v, u)):
+            candidate = self.dist.get(a, INF) + length
+            if candidate < self.dist.get(b, INF):
+                self.dist[b] = candidate
+                self._set_pred(b, a)
+                heappush(fringe, (candidate, next(c), b))
+
+        changed = set()
+        while fringe:
+            d, _, x = heappop(fringe)
+            if d > self.dist[x]:
+                continue  # stale entry
+            changed.add(x)
+            for y, e in G.adj[x].items():
+                cost = e.get(self.weight)
+                if cost is None:
+                    continue
+                candidate = d + cost
+                if candidate < self.dist.get(y, INF):
+                    self.dist[y] = candidate
+                    self._set_pred(y, x)
+                    heappush(fringe, (candidate, next(c), y))
+
+        return changed
+
+    def edge_increased(self, G, u, v):
+        """Repair after the edge u-v was removed from G or made longer.
+
+        Returns
+        -------
+        set
+            Nodes whose shortest path changed.
+        """
+        if self.pred.get(v) == u:
+            top = v
+        elif self.pred.get(u) == v:
+            top = u
+        else:
+            return set()  # not a tree edge, so no shortest path used it
+
+        # the subtree below the edge loses its paths
+        affected = set()
+        stack = [top]
+        while stack:
+            x = stack.pop()
+            affected.add(x)
+            stack.extend(self.children.get(x, ()))
+        old = {x: (self.dist[x], self.pred[x]) for x in affected}
+
+        # each affected node starts from its best unaffected neighbour
+        fringe = []
+        c = count()
+        for x in affected:
+            best, parent = INF, None
+            for y, e in G.adj[x].items():
+                cost = e.get(self.weight)
+                if cost is None or y in affected or y not in self.dist:
+                    continue
+                if self.dist[y] + cost < best:
+                    best, parent = self.dist[y] + cost, y
+            self._set_pred(x, parent)
+            if parent is None:
+                del self.dist[x]
+            else:
+                self.dist[x] = best
+                heappush(fringe, (best, next(c), x))
+
+        settled = set()
+        while fringe:
+            d, _, x = heappop(fringe)
+            if x in settled or d > self.dist.get(x, INF):
+                continue
+            settled.add(x)
+            for y, e in G.adj[x].items():
+                cost = e.get(self.weight)
+                if cost is None or y not in affected or y in settled:
+                    continue
+                candidate = d + cost
+                if candidate < self.dist.get(y, INF):
+                    self.dist[y] = candidate
+                    self._set_pred(y, x)
+                    heappush(fringe, (candidate, next(c), y))
+
+        # nodes left without a parent are now unreachable
+        for x in affected:
+            if self.pred.get(x) is None and x in self.pred:
+                del self.pred[x]
+
+        changed = {x for x in affected if (self.dist.get(x), self.pred.get(x)) != old[x]}
+        return self._with_descendants(changed)
+
+    def _with_descendants(self, nodes):
+        result = set()
+        stack = list(nodes)
+        while stack:
+            x = stack.pop()
+            if x in result:
+                continue
+            result.add(x)
+            stack.extend(self.children.get(x, ()))
+        return result
+
+    def path(self, sink):
+        """Nodes from source to sink.
+        """
+        if sink not in self.dist:
+            raise networkx.NetworkXNoPath('no path from {} to {}'.format(self.source, sink))
+        path = [sink]
+        while path[-1] != self.source:
+            path.append(self.pred[path[-1]])
+        return path[::-1]
+
+
+class DynamicShortestPaths(object):
+    """Shortest path trees from many sources, kept current under edits.
+
+    Parameters
+    ----------
+    G : networkx.Graph
+        Undirected road graph, edited in place through this object.
+    sources_sinks : dict
+        Source node to list of sink nodes, as for ``shortest_path_trees``.
+    weight : str, optional
+        Edge attribute holding lengths.
+
+    """
+    def __init__(self, G, sources_sinks, weight='length'):
+        if G.is_directed():
+            raise ValueError('DynamicShortestPaths needs an undirected graph')
+        self.G = G
+        self.weight = weight
+        self.sinks = {source: list(sinks) for source, sinks in sources_sinks.items()}
+        self.states = {source: ShortestPathState(G, source, weight) for source in self.sinks}
+
+    def add_edge(self, u, v, length, **attr):
+        """Add a road segment, or replace the length of an existing one.
+
+        Returns
+        -------
+        dict
+            Source to the list of its sinks whose path changed.
+        """
+        if self.G.has_edge(u, v):
+            return self.set_length(u, v, length)
+        attr[self.weight] = length
+        self.G.add_edge(u, v, **attr)
+        return self._changed_sinks(lambda state: state.edge_decreased(self.G, u, v))
+
+    def remove_edge(self, u, v):
+        """Close a road segment. See ``add_edge`` for the result.
+        """
+        self.G.remove_edge(u, v)
+        return self._changed_sinks(lambda state: state.edge_increased(self.G, u, v))
+
+    def set_length(self, u, v, length):
+        """Change a road segment's length. See ``add_edge`` for the result.
+        """
+        old = self.G.edges[u, v].get(self.weight)
+        self.G.edges[u, v][self.weight] = length
+        if old is None or length < old:
+            return self._changed_sinks(lambda state: state.edge_decreased(self.G, u, v))
+        if length > old:
+            return self._changed_sinks(lambda state: state.edge_increased(self.G, u, v))
+        return {source: [] for source in self.states}
+
+    def _changed_sinks(self, repair):
+        result = {}
+        for source, state in self.states.items():
+            changed = repair(state)
+            result[source] = [sink for sink in self.sinks[source] if sink in changed]
+        return result
+
+    def tree(self, source):
+        """Shortest path tree from source to its sinks, as from
+        ``shortest_path_tree``, with edge ``row`` attributes copied from G.
+        """
+        state = self.states[source]
+        tree = networkx.Graph()
+        tree.add_node(source)
+        for sink in self.sinks[source]:
+            tree.add_node(sink)
+            networkx.add_path(tree, state.path(sink))
+        for a, b, data in tree.edges(data=True):
+            row = self.G.edges[a, b].get('row')
+            if row is not None:
+                data['row'] = row
+        return tree
+
+
+def _weight_function(weight):
+    def get_weight(u, v, e):
+        return e.get(weight)
+    return get_weight
+
+
+def benchmark(side=150, n_sources=10, n_sinks=20, n_edits=200, seed=0):
+    """Time edits against recomputing every source from scratch.
+    """
+    rng = random.Random(seed)
+    G = networkx.grid_2d_graph(side, side)
+    for u, v in G.edges:
+        G.edges[u, v]['length'] = rng.uniform(0.01, 0.1)
+    nodes = list(G)
+    sources_sinks = {source: rng.sample(nodes, n_sinks) for source in rng.sample(nodes, n_sources)}
+
+    dynamic = DynamicShortestPaths(G, sources_sinks)
+    n_changed = 0
+    elapsed = 0.0
+    for _ in range(n_edits):
+        u, v = rng.choice(list(G.edges)) if rng.random() < 0.6 else rng.sample(nodes, 2)
+
+        start = time.perf_counter()
+        if not G.has_edge(u, v):
+            changed = dynamic.add_edge(u, v, rng.uniform(0.01, 0.5))
+        elif rng.random() < 0.5:
+            changed = dynamic.remove_edge(u, v)
+        else:
+            changed = dynamic.set_length(u, v, G.edges[u, v]['length'] * rng.uniform(0.5, 2))
+        elapsed += time.perf_counter() - start
+        n_changed += sum(len(sinks) for sinks in changed.values())
+
+    start = time.perf_counter()
+    for source in sources_sinks:
+        ShortestPathState(G, source)
+    rebuild = time.perf_counter() - start
+
+    print('{} sources on {} nodes: {:.2f} ms per edit, {:.0f} ms to recompute all; '
+          '{:.2f} changed sinks per edit'.format(
+              n_sources, len(G), elapsed / n_edits * 1e3, rebuild * 1e3, n_changed / n_edits))
+
+
+if __name__ == '__main__':
+    benchmark()
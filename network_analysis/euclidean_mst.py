@@ -0,0 +1,112 @@
+"""Minimum spanning trees over point layers via Delaunay triangulation.
+
+A Euclidean minimum spanning tree is a subgraph of the Delaunay
+triangulation, so Kruskal only needs to scan the O(n) triangulation edges
+instead of the complete graph.
+
+For geodesic (great-circle) weights the points are first projected
+stereographically about their centroid. Stereographic projection maps
+circles on the sphere to circles in the plane, so the planar Delaunay
+triangulation of the projected points still contains every spherical MST
+edge, as long as the layer fits inside a hemisphere.
+"""
+import time
+
+import numpy
+from shapely.geometry import shape
+
+from candidate_edges import candidate_edges, edge_lengths
+from distance import distances
+from kruskal import kruskal
+
+
+def euclidean_mst(features, geodesic=False):
+    """Minimum spanning tree of GeoJSON point features.
+
+    Parameters
+    ----------
+    features : list
+        GeoJSON point features with an ``id`` property, as passed to
+        ``load_nodes``.
+    geodesic : bool, optional
+        Treat coordinates as WGS-84 longitude/latitude and weight edges by
+        great-circle distance in kilometres instead of planar distance.
+
+    Returns
+    -------
+    list
+        Tree edges as ``[u, v, w]``, with ``u < v`` node ids and weights
+        rounded as in ``load_nodes``, in non-decreasing order of weight.
+        Empty for fewer than two points.
+
+    """
+    ids = [feature['properties']['id'] for feature in features]
+    coords = [shape(feature['geometry']).coords[0] for feature in features]
+    return euclidean_mst_from_coords(ids, coords, geodesic=geodesic)
+
+
+def euclidean_mst_from_coords(ids, coords, geodesic=False):
+    """Minimum spanning tree of points given as ids and an ``(n, 2)`` array.
+
+    See ``euclidean_mst``.
+    """
+    coords = numpy.asarray(coords, dtype=numpy.float64).reshape(-1, 2)
+    if len(coords) < 2:
+        return []  # an empty or single-point layer has no edges
+
+    if geodesic:
+        u, v = candidate_edges(_stereographic(coords))
+        weights = distances(coords[u], coords[v], method='haversine')
+    else:
+        u, v = candidate_edges(coords)
+        weights = edge_lengths(coords, u, v)
+    weights = numpy.round(weights, 4)
+
+    mst = kruskal(u, v, weights, len(coords))
+
+    result = []
+    for a, b, weight in zip(u[mst].tolist(), v[mst].tolist(), weights[mst].tolist()):
+        id_a, id_b = sorted((ids[a], ids[b]))
+        result.append([id_a, id_b, weight])
+    return result
+
+
+def _unit_vectors(coords):
+    lon, lat = numpy.radians(coords).T
+    return numpy.column_stack((
+        numpy.cos(lat) * numpy.cos(lon),
+        numpy.cos(lat) * numpy.sin(lon),
+        numpy.sin(lat)
+    ))
+
+
+def _stereographic(coords):
+    """Stereographic projection of lon/lat points about their centroid.
+    """
+    points = _unit_vectors(coords)
+    centre = points.sum(axis=0)
+    centre /= numpy.linalg.norm(centre)
+
+    # any axis not parallel to the centre gives an orthonormal basis
+    axis = numpy.eye(3)[numpy.argmin(numpy.abs(centre))]
+    e1 = numpy.cross(centre, axis)
+    e1 /= numpy.linalg.norm(e1)
+    e2 = numpy.cross(centre, e1)
+
+    height = points @ centre
+    if (height <= 0).any():
+        raise ValueError('geodesic MST needs all points within one hemisphere')
+
+    return numpy.column_stack((points @ e1, points @ e2)) / (1 + height)[:, None]
+
+
+if __name__ == '__main__':
+    rng = numpy.random.default_rng(0)
+    for n in (10**3, 10**4, 10**5, 10**6):
+        # random points over the south of England
+        coords = numpy.column_stack((rng.uniform(-3, 1.5, n), rng.uniform(50.5, 52.8, n)))
+        ids = list(range(n))
+
+        start = time.perf_counter()
+        euclidean_mst_from_coords(ids, coords, geodesic=True)
+        print('{:>8} points: {:.2f}s'.format(n, time.perf_counter() - start))
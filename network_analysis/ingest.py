@@ -0,0 +1,306 @@
+"""Streaming readers for large point layers.
+
+``read_points`` yields chunks of point coordinates and property values from
+GeoJSON (a FeatureCollection, or newline-delimited features) or GeoPackage
+files. Every chunk is written into preallocated NumPy arrays, so peak
+memory depends on the chunk size rather than the file size:
+
+- GeoJSON is read as a stream of parser events with ``ijson``, an optional
+  dependency, so no feature is built as a dict. Without ijson,
+  newline-delimited files are still read a line (one feature) at a time
+  with ``json``, but a FeatureCollection cannot be streamed.
+- GeoPackage features are fetched in batches with ``sqlite3``, and each
+  point is decoded straight from its GeoPackage binary header and WKB.
+
+``load_points`` collects all chunks into whole arrays, for example for
+``euclidean_mst.euclidean_mst_from_coords``.
+"""
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+import time
+
+import numpy
+
+NDJSON_EXTENSIONS = ('.geojsonl', '.geojsons', '.ndjson', '.jsonl')
+
+# GeoPackage binary header envelope sizes, by the flags' envelope indicator
+_ENVELOPE_BYTES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+
+def read_points(path, fields=('id',), chunk_size=100000, layer=None):
+    """Read point features from a file in chunks.
+
+    Parameters
+    ----------
+    path : str
+        A ``.gpkg`` GeoPackage, or a GeoJSON FeatureCollection or
+        newline-delimited GeoJSON file.
+    fields : sequence of str, optional
+        Feature properties (GeoPackage columns) to read alongside the
+        coordinates.
+    chunk_size : int, optional
+        Most features per chunk.
+    layer : str, optional
+        GeoPackage table to read, by default the first feature table.
+
+    Yields
+    ------
+    tuple
+        ``(coords, values)``: an ``(n, 2)`` float64 array of x, y (lon, lat)
+        and a dict of field name to an object array of length ``n``. Missing
+        properties are None, and null geometries give NaN coordinates.
+        The arrays are reused for the next chunk, so copy them to keep them.
+
+    """
+    fields = tuple(fields)
+    if path.endswith('.gpkg'):
+        rows = _geopackage_rows(path, fields, layer)
+    elif _is_ndjson(path):
+        rows = _ndjson_rows(path, fields)
+    else:
+        rows = _feature_collection_rows(path, fields)
+
+    coords = numpy.empty((chunk_size, 2), dtype=numpy.float64)
+    values = {field: numpy.empty(chunk_size, dtype=object) for field in fields}
+    columns = [values[field] for field in fields]
+
+    n = 0
+    for x, y, row in rows:
+        coords[n, 0] = x
+        coords[n, 1] = y
+        for column, value in zip(columns, row):
+            column[n] = value
+        n += 1
+        if n == chunk_size:
+            yield coords, values
+            n = 0
+    if n:
+        yield coords[:n], {field: column[:n] for field, column in values.items()}
+
+
+def load_points(path, fields=('id',), chunk_size=100000, layer=None):
+    """Read a whole point layer with ``read_points``.
+
+    Returns
+    -------
+    tuple
+        ``(coords, values)`` as from ``read_points``, over all features.
+
+    """
+    coord_chunks = []
+    value_chunks = {field: [] for field in fields}
+    for coords, values in read_points(path, fields, chunk_size, layer):
+        coord_chunks.append(coords.copy())
+        for field, column in values.items():
+            value_chunks[field].append(column.copy())
+
+    if not coord_chunks:
+        return numpy.empty((0, 2)), {field: numpy.empty(0, dtype=object) for field in fields}
+    return (
+        numpy.concatenate(coord_chunks),
+        {field: numpy.concatenate(chunks) for field, chunks in value_chunks.items()}
+    )
+
+
+def _is_ndjson(path):
+    """True for newline-delimited GeoJSON, by extension or by the first line
+    holding one whole feature.
+    """
+    if path.endswith(NDJSON_EXTENSIONS):
+        return True
+    with open(path, 'rb') as f:
+        first = f.readline(1 << 20).strip()
+    if not first.startswith(b'{'):
+        return False
+    try:
+        return json.loads(first).get('type') == 'Feature'
+    except ValueError:
+        return False
+
+
+def _ndjson_rows(path, fields):
+    # ijson is optional (pip install ijson): it parses without building a
+    # dict per feature. Without it, fall back to json one line at a time.
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    with open(path, 'rb') as f:
+        if ijson is not None:
+            events = ijson.parse(f, multiple_values=True, use_float=True)
+            yield from _event_rows(events, '', fields)
+        else:
+            # one feature at a time, held only while its line is read
+            for line in f:
+                if not line.strip():
+                    continue
+                feature = json.loads(line)
+                geometry = feature.get('geometry') or {}
+                x, y = (geometry.get('coordinates') or (numpy.nan, numpy.nan))[:2]
+                properties = feature.get('properties') or {}
+                yield x, y, tuple(properties.get(field) for field in fields)
+
+
+def _feature_collection_rows(path, fields):
+    # a FeatureCollection is one JSON value, so only the optional ijson can
+    # stream it; there is no json fallback
+    try:
+        import ijson
+    except ImportError:
+        raise ImportError(
+            'streaming a GeoJSON FeatureCollection needs ijson; '
+            'install it or convert the file to newline-delimited GeoJSON')
+
+    with open(path, 'rb') as f:
+        events = ijson.parse(f, use_float=True)
+        yield from _event_rows(events, 'features.item', fields)
+
+
+def _event_rows(events, feature_prefix, fields):
+    """Rows from ijson parser events for features at ``feature_prefix``.
+    """
+    base = feature_prefix + '.' if feature_prefix else ''
+    coordinate_prefix = base + 'geometry.coordinates.item'
+    property_prefixes = {base + 'properties.' + field: k for k, field in enumerate(fields)}
+    n_fields = len(fields)
+
+    coords = []
+    row = [None] * n_fields
+    for prefix, event, value in events:
+        if prefix == coordinate_prefix:
+            if event == 'number':
+                coords.append(value)
+        elif prefix in property_prefixes:
+            # start_map/start_array of nested values are kept as None
+            if event in ('number', 'string', 'boolean', 'null'):
+                row[property_prefixes[prefix]] = value
+        elif prefix == feature_prefix and event == 'end_map':
+            if len(coords) >= 2:
+                yield coords[0], coords[1], tuple(row)
+            else:
+                yield numpy.nan, numpy.nan, tuple(row)
+            coords = []
+            row = [None] * n_fields
+
+
+def _geopackage_rows(path, fields, layer=None):
+    connection = sqlite3.connect('file:{}?mode=ro'.format(path), uri=True)
+    try:
+        query = 'SELECT table_name, column_name FROM gpkg_geometry_columns'
+        if layer is not None:
+            query += ' WHERE table_name = ?'
+            tables = connection.execute(query, (layer,)).fetchall()
+        else:
+            tables = connection.execute(query).fetchall()
+        if not tables:
+            raise ValueError('no feature table {}in {}'.format(
+                '{!r} '.format(layer) if layer else '', path))
+        table, geometry_column = tables[0]
+
+        # fields the table does not have are read as NULL
+        present = {row[1] for row in connection.execute('PRAGMA table_info({})'.format(_quote(table)))}
+        columns = ', '.join(
+            _quote(name) if name in present else 'NULL'
+            for name in (geometry_column,) + fields
+        )
+        cursor = connection.execute('SELECT {} FROM {}'.format(columns, _quote(table)))
+        while True:
+            batch = cursor.fetchmany(10000)
+            if not batch:
+                break
+            for record in batch:
+                x, y = _gpkg_point(record[0])
+                yield x, y, record[1:]
+    finally:
+        connection.close()
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _gpkg_point(blob):
+    """x, y of a GeoPackage binary point geometry (NaN if null or empty).
+    """
+    if blob is None or blob[:2] != b'GP':
+        return numpy.nan, numpy.nan
+    flags = blob[3]
+    if flags & 0x10:  # empty geometry
+        return numpy.nan, numpy.nan
+    offset = 8 + _ENVELOPE_BYTES[(flags >> 1) & 0x07]
+
+    # WKB: byte order, geometry type, then x, y (and z, m if present)
+    order = '<' if blob[offset] == 1 else '>'
+    (geometry_type,) = struct.unpack_from(order + 'I', blob, offset + 1)
+    if geometry_type % 1000 != 1:
+        raise ValueError('expected Point geometries, found WKB type {}'.format(geometry_type))
+    return struct.unpack_from(order + 'dd', blob, offset + 5)
+
+
+def _write_test_files(directory, n, seed=0):
+    """Write ``n`` random points as NDJSON, a FeatureCollection and a
+    minimal GeoPackage, for the benchmark.
+    """
+    rng = numpy.random.default_rng(seed)
+    coords = numpy.column_stack((rng.uniform(-3, 1.5, n), rng.uniform(50.5, 52.8, n)))
+    template = '{{"type": "Feature", "geometry": {{"type": "Point", "coordinates": [{}, {}]}}, ' \
+        '"properties": {{"id": {}, "name": "premises_{}", "link": "cabinet_{}"}}}}'
+
+    ndjson = os.path.join(directory, 'points.geojsonl')
+    with open(ndjson, 'w') as f:
+        for i, (x, y) in enumerate(coords.tolist()):
+            f.write(template.format(x, y, i, i, i // 32) + '\n')
+
+    collection = os.path.join(directory, 'points.geojson')
+    with open(collection, 'w') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for i, (x, y) in enumerate(coords.tolist()):
+            f.write((',\n' if i else '') + template.format(x, y, i, i, i // 32))
+        f.write('\n]}\n')
+
+    gpkg = os.path.join(directory, 'points.gpkg')
+    connection = sqlite3.connect(gpkg)
+    connection.execute(
+        'CREATE TABLE gpkg_geometry_columns (table_name TEXT, column_name TEXT, '
+        'geometry_type_name TEXT, srs_id INTEGER, z TINYINT, m TINYINT)')
+    connection.execute("INSERT INTO gpkg_geometry_columns VALUES ('points', 'geom', 'POINT', 4326, 0, 0)")
+    connection.execute('CREATE TABLE points (fid INTEGER PRIMARY KEY, geom BLOB, id INTEGER, name TEXT, link TEXT)')
+    header = b'GP\x00\x01' + struct.pack('<i', 4326)
+    connection.executemany(
+        'INSERT INTO points (geom, id, name, link) VALUES (?, ?, ?, ?)',
+        (
+            (header + struct.pack('<BIdd', 1, 1, x, y), i, 'premises_{}'.format(i), 'cabinet_{}'.format(i // 32))
+            for i, (x, y) in enumerate(coords.tolist())
+        )
+    )
+    connection.commit()
+    connection.close()
+
+    return coords, (ndjson, collection, gpkg)
+
+
+def benchmark(n=10**6, chunk_size=100000):
+    """Report features ingested per second from each format.
+    """
+    directory = tempfile.mkdtemp()
+    coords, paths = _write_test_files(directory, n)
+    fields = ('id', 'link')
+
+    for path in paths:
+        start = time.perf_counter()
+        offset = 0
+        for chunk, values in read_points(path, fields, chunk_size):
+            assert numpy.array_equal(chunk, coords[offset:offset + len(chunk)])
+            offset += len(chunk)
+        elapsed = time.perf_counter() - start
+        assert offset == n
+        print('{:>18}: {:>10.0f} features/s ({:.0f} MB)'.format(
+            os.path.basename(path), n / elapsed, os.path.getsize(path) / 1e6))
+
+
+if __name__ == '__main__':
+    benchmark()
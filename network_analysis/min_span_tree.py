@@ -6,16 +6,29 @@
 
 from collections import defaultdict 
 from shapely.geometry import shape
+import logging
 import pprint
+import time
+
+import numpy
+
+from candidate_edges import candidate_edges, edge_lengths
+from kruskal import KruskalStats, edge_arrays, kruskal
+
+logger = logging.getLogger(__name__)
 
 #Class to represent a graph 
 class Graph: 
 
-    def __init__(self,vertices): 
+    def __init__(self,vertices, instrument=False): 
         self.V= vertices #No. of vertices
         self.graph = [] # default dictionary 
         # to store graph 
 
+        # collect a KruskalStats into self.stats on each KruskalMST run
+        self.instrument = instrument
+        self.stats = None
+
 	# function to add an edge to graph 
     def addEdge(self,u,v,w): 
     	self.graph.append([u,v,w]) 
@@ -43,116 +56,45 @@ class Graph:
             # print(u, v, w)
             self.graph.append([u,v,w]) 
 
-		
-		
-	# A utility function to find set of an element i 
-	# (uses path compression technique) 
-    def find(self, parent, i): 
-        print('find for {} is {}'.format(parent, i))
-        #catch = parent[i]
-        #print('parent[i] is {}'.format(catch))
-        if parent[i] == i: 
-            return i, print('returned (if) {}'.format(i)) 
-        return self.find(parent, parent[i]), print('returned self.find({}, {})'.format(parent, parent[i]))  
-
-	# A function that does union of two sets of x and y 
-	# (uses union by rank) 
-    def union(self, parent, rank, x, y): 
-    	xroot = self.find(parent, x) 
-    	yroot = self.find(parent, y) 
-    	print('xroot is {}'.format(x))
-    	print('yroot is {}'.format(y))
-		# Attach smaller rank tree under root of 
-		# high rank tree (Union by Rank) 
-    	if rank[xroot] < rank[yroot]: 
-    		parent[xroot] = yroot 
-    	elif rank[xroot] > rank[yroot]: 
-    		parent[yroot] = xroot 
-
-		# If ranks are same, then make one as root 
-		# and increment its rank by one 
-    	else : 
-    		parent[yroot] = xroot 
-    		rank[xroot] += 1
-
-    # The main function to construct MST using Kruskal's algorithm 
+    # The main function to construct MST using Kruskal's algorithm
     def KruskalMST(self):
-        
-        result =[] #This will store the resultant MST 
-        
-        i = 0 # An index variable, used for sorted edges 
-        e = 0 # An index variable, used for result[] 
-
-            # Step 1: Sort all the edges in non-decreasing 
-                # order of their 
-                # weight. If we are not allowed to change the 
-                # given graph, we can create a copy of graph 
-        # pprint.pprint(self.graph)
-        self.graph = sorted(self.graph,key=lambda item: item[2]) 
-        print('sorted_graph')
-        pprint.pprint(self.graph)
-        # print('sorted_graph')
-        parent = [] ; rank = [] 
-        
-        vertices = self.V
-
-        print('vertices count is {}'.format(vertices))
-
-        # Create V subsets with single elements 
-        for node in range(self.V): 
-            parent.append(node) 
-            rank.append(0) 
-        pprint.pprint('parent is {}'.format(parent))
-
-        # Number of edges to be taken is equal to V-1 
-        while e < self.V -1 : 
-            print('i is {}'.format(i))
-            #print(i)
-            # Step 2: Pick the smallest edge and increment 
-                    # the index for next iteration 
-            print(self.graph[i])
-            u,v,w = self.graph[i]
-            print('u is {}'.format(u))
-            print('v is {}'.format(v))
-            print('w is {}'.format(w))
-
-            print('i is {}'.format(i))
-
-            i = i + 1
-            x = self.find(parent, u) 
-            y = self.find(parent, v) 
-
-            print('x is {}'.format(x))
-            print('y is {}'.format(y))
-            # If including this edge does't cause cycle, 
-                        # include it in result and increment the index 
-                        # of result for next edge 
-            if x != y: 
-                print('x not equal to y')
-                e = e + 1	
-                result.append([u,v,w]) 
-                print('x is {}'.format(x))
-                print('y is {}'.format(y))
-                self.union(parent, rank, x, y)			 
-            # Else discard the edge 
-
-        # print the contents of result[] to display the built MST 
-        print ("Following are the edges in the constructed MST")
-        for u,v,weight in result: 
-            #print str(u) + " -- " + str(v) + " == " + str(weight) 
-            print ("%d -- %d == %d" % (u,v,weight)) 
-    
+
+        stats = KruskalStats() if self.instrument else None
+
+        # Edges go into u, v, w columns, are sorted once by weight and
+        # scanned with an array-backed union-find (see kruskal.py)
+        u, v, w = edge_arrays(self.graph)
+        mst_index = kruskal(u, v, w, self.V, stats=stats)
+
+        start = time.perf_counter()
+        result = [self.graph[i] for i in mst_index.tolist()]
+
+        # log the contents of result[] to display the built MST
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Following are the edges in the constructed MST")
+            for u,v,weight in result:
+                logger.debug("%d -- %d == %d", u, v, weight)
+
+        if stats is not None:
+            stats.output_seconds = time.perf_counter() - start
+            logger.info('%r', stats)
+        self.stats = stats
+
         return result
 
 
-def load_nodes(nodes):
+def load_nodes(nodes, k=None, radius=None):
     
     graph_size = len(nodes) #* len(nodes)
 
-    print('length is {}'.format(graph_size))
+    logger.debug('length is %d', graph_size)
 
     G = Graph(graph_size)
 
+    if k is not None or radius is not None:
+        add_candidate_edges(G, nodes, k, radius)
+        return G
+
     for node1 in nodes:
         for node2 in nodes:
             if node1['properties']['id'] != node2['properties']['id']: 
@@ -172,6 +114,22 @@ def load_nodes(nodes):
     return G
 
 
+def add_candidate_edges(G, nodes, k=None, radius=None):
+    """Add only Delaunay, k-nearest and within-radius edges between nodes
+
+    The Delaunay edges keep the minimum spanning tree exact (see
+    candidate_edges.py), so this is a drop-in for the all-pairs loop.
+    """
+    ids = [node['properties']['id'] for node in nodes]
+    coords = [shape(node['geometry']).coords[0] for node in nodes]
+
+    u, v = candidate_edges(coords, k=k, radius=radius)
+    weights = numpy.round(edge_lengths(coords, u, v), 4)
+
+    for a, b, weight in zip(u.tolist(), v.tolist(), weights.tolist()):
+        id_a, id_b = sorted((ids[a], ids[b]))
+        G.addEdge(id_a, id_b, weight)
+
 
 if __name__ == "__main__":
 
@@ -8,10 +8,20 @@ from collections import defaultdict
 from shapely.geometry import shape
 import pprint
 
+import numpy
+
+from candidate_edges import candidate_edges, edge_lengths
+from kruskal import DisjointSet
+
 
 class Graph(object):
     def __init__(self):
         self.g = {}
+        # one (from, to) -> weight entry per undirected edge, kept in step
+        # with self.g by add()
+        self._edges = {}
+        # sorted edge lists, keyed by desc, dropped when edges change
+        self._sorted = {}
 
     def add(self, vertex1, vertex2, weight):
         if vertex1 not in self.g:
@@ -23,56 +33,53 @@ class Graph(object):
         self.g[vertex1][vertex2] = weight
         self.g[vertex2][vertex1] = weight
 
+        key = (vertex2, vertex1) if (vertex2, vertex1) in self._edges else (vertex1, vertex2)
+        if key not in self._edges or self._edges[key] != weight:
+            self._edges[key] = weight
+            self._sorted.clear()
+
+    def remove(self, vertex1, vertex2):
+        """Remove the edge between two vertices; both stay in the graph.
+        """
+        del self.g[vertex1][vertex2]
+        del self.g[vertex2][vertex1]
+
+        key = (vertex2, vertex1) if (vertex2, vertex1) in self._edges else (vertex1, vertex2)
+        del self._edges[key]
+        self._sorted.clear()
+
+    def remove_vertex(self, vertex):
+        """Remove a vertex and all its edges.
+        """
+        for other in list(self.g[vertex]):
+            self.remove(vertex, other)
+        del self.g[vertex]
+
     def has_link(self, v1, v2):
         return v2 in self[v1] or v1 in self[v2]
 
     def edges(self):
-        data = []
-
-        for from_vertex, destinations in self.g.items():
-            for to_vertex, weight in destinations.items():
-                if (to_vertex, from_vertex, weight) not in data:
-                    data.append((from_vertex, to_vertex, weight))
-
-        return data
+        return [(from_vertex, to_vertex, weight)
+                for (from_vertex, to_vertex), weight in self._edges.items()]
 
     def sorted_by_weight(self, desc=False):
-        return sorted(self.edges(), key=lambda x: x[2], reverse=desc)
+        if desc not in self._sorted:
+            self._sorted[desc] = sorted(self.edges(), key=lambda x: x[2], reverse=desc)
+        return list(self._sorted[desc])
 
     def spanning_tree(self, minimum=True):
         mst = Graph()
-        parent = {}
-        rank = {}
-
-        def find_parent(vertex):
-            while parent[vertex] != vertex:
-                vertex = parent[vertex]
-
-            return vertex
-
-        def union(root1, root2):
-            if rank[root1] > rank[root2]:
-                parent[root2] = root1
-            else:
-                parent[root2] = root1
-
-                if rank[root2] == rank[root1]:
-                    rank[root2] += 1
-
-        for vertex in self.g:
-            parent[vertex] = vertex
-            rank[vertex] = 0
+        components = DisjointSet(self.g)
+        n_tree_edges = 0
 
         for v1, v2, weight in self.sorted_by_weight(not minimum):
-            parent1 = find_parent(v1)
-            parent2 = find_parent(v2)
-
-            if parent1 != parent2:
+            if components.union(v1, v2):
                 mst.add(v1, v2, weight)
-                union(parent1, parent2)
+                n_tree_edges += 1
 
-            if len(self) == len(mst):
-                break
+                # a spanning tree has one edge fewer than vertices
+                if n_tree_edges == len(self) - 1:
+                    break
 
         return mst
 
@@ -83,16 +90,20 @@ class Graph(object):
         return self.g[node]
 
     def __iter__(self):
-        for edge in self.edges():
-            yield edge
+        for (from_vertex, to_vertex), weight in self._edges.items():
+            yield from_vertex, to_vertex, weight
 
     def __str__(self):
         return "\n".join('from %s to %s: %d' % edge for edge in self.edges())
 
-def load_nodes(nodes):
+def load_nodes(nodes, k=None, radius=None):
     
     G = Graph()
 
+    if k is not None or radius is not None:
+        add_candidate_edges(G, nodes, k, radius)
+        return G
+
     for node1 in nodes:
         for node2 in nodes:
             if node1['properties']['id'] != node2['properties']['id']: 
@@ -109,6 +120,66 @@ def load_nodes(nodes):
 
     return G
 
+
+def add_candidate_edges(G, nodes, k=None, radius=None):
+    """Add sparse candidate edges between nodes instead of all pairs
+    """
+    ids = [node['properties']['id'] for node in nodes]
+    coords = [shape(node['geometry']).coords[0] for node in nodes]
+
+    u, v = candidate_edges(coords, k=k, radius=radius)
+    weights = numpy.round(edge_lengths(coords, u, v), 4)
+
+    for a, b, weight in zip(u.tolist(), v.tolist(), weights.tolist()):
+        id_a, id_b = sorted((ids[a], ids[b]))
+        G.add(id_a, id_b, weight)
+
+
+import networkx as nx
+import matplotlib.pyplot as plt
+
+def draw_graph(graph, labels=None, graph_layout='shell',
+               node_size=1600, node_color='blue', node_alpha=0.3,
+               node_text_size=12,
+               edge_color='blue', edge_alpha=0.3, edge_tickness=1,
+               edge_text_pos=0.3,
+               text_font='sans-serif'):
+
+    # create networkx graph
+    G=nx.Graph()
+
+    # add edges
+    for edge in graph:
+        G.add_edge(edge[0], edge[1], weight = edge[2])
+
+    # these are different layouts for the network you may try
+    # shell seems to work best
+    if graph_layout == 'spring':
+        graph_pos=nx.spring_layout(G)
+    elif graph_layout == 'spectral':
+        graph_pos=nx.spectral_layout(G)
+    elif graph_layout == 'random':
+        graph_pos=nx.random_layout(G)
+    else:
+        graph_pos=nx.shell_layout(G)
+
+    # draw graph
+    nx.draw_networkx_nodes(G,graph_pos,node_size=node_size, 
+                           alpha=node_alpha, node_color=node_color)
+    nx.draw_networkx_edges(G,graph_pos,width=edge_tickness,
+                           alpha=edge_alpha,edge_color=edge_color)
+    nx.draw_networkx_labels(G, graph_pos,font_size=node_text_size,
+                            font_family=text_font)
+
+    if labels is None:
+        labels = range(len(graph))
+
+    edge_labels = dict(zip(graph, labels))
+    nx.draw_networkx_edge_labels(G, graph_pos)
+    # show graph
+    plt.show()
+
+
 if __name__ == "__main__":
 
     GEOJSON_DIST_POINTS = [
@@ -186,72 +257,18 @@ if __name__ == "__main__":
         }
     ]
 
-graph = load_nodes(GEOJSON_DIST_POINTS)
-
-mst = graph.spanning_tree()
-# print()
-# print(graph.spanning_tree(False))
-
-
-import networkx as nx
-import matplotlib.pyplot as plt
-
-def draw_graph(graph, labels=None, graph_layout='shell',
-               node_size=1600, node_color='blue', node_alpha=0.3,
-               node_text_size=12,
-               edge_color='blue', edge_alpha=0.3, edge_tickness=1,
-               edge_text_pos=0.3,
-               text_font='sans-serif'):
-
-    # create networkx graph
-    G=nx.Graph()
-
-    # add edges
-    for edge in graph:
-        G.add_edge(edge[0], edge[1], weight = edge[2])
-
-    # these are different layouts for the network you may try
-    # shell seems to work best
-    if graph_layout == 'spring':
-        graph_pos=nx.spring_layout(G)
-    elif graph_layout == 'spectral':
-        graph_pos=nx.spectral_layout(G)
-    elif graph_layout == 'random':
-        graph_pos=nx.random_layout(G)
-    else:
-        graph_pos=nx.shell_layout(G)
-
-    # draw graph
-    nx.draw_networkx_nodes(G,graph_pos,node_size=node_size, 
-                           alpha=node_alpha, node_color=node_color)
-    nx.draw_networkx_edges(G,graph_pos,width=edge_tickness,
-                           alpha=edge_alpha,edge_color=edge_color)
-    nx.draw_networkx_labels(G, graph_pos,font_size=node_text_size,
-                            font_family=text_font)
-
-    if labels is None:
-        labels = range(len(graph))
-
-    edge_labels = dict(zip(graph, labels))
-    nx.draw_networkx_edge_labels(G, graph_pos)
-    # show graph
-    plt.show()
-
-# graph = [(0, 1), (1, 5), (1, 7), (4, 5), (4, 8), (1, 6), (3, 7), (5, 9),
-#          (2, 4), (0, 4), (2, 5), (3, 6), (8, 9)]
-
-# # you may name your edge labels
-# labels = map(chr, range(65, 65+len(graph)))
-# #draw_graph(graph, labels)
-
-# if edge labels is not specified, numeric labels (0, 1, 2...) will be used
-draw_graph(mst)
-
-
-
-
-
+    graph = load_nodes(GEOJSON_DIST_POINTS)
 
+    mst = graph.spanning_tree()
+    # print()
+    # print(graph.spanning_tree(False))
 
+    # graph = [(0, 1), (1, 5), (1, 7), (4, 5), (4, 8), (1, 6), (3, 7), (5, 9),
+    #          (2, 4), (0, 4), (2, 5), (3, 6), (8, 9)]
 
+    # # you may name your edge labels
+    # labels = map(chr, range(65, 65+len(graph)))
+    # #draw_graph(graph, labels)
 
+    # if edge labels is not specified, numeric labels (0, 1, 2...) will be used
+    draw_graph(mst)
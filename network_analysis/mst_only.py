@@ -1,5 +1,6 @@
 import networkx
-from geopy.distance import vincenty
+
+from distance import distances
 
 PREMISES = [
     {
@@ -66,11 +67,12 @@ def main():
         name = node['properties']['name']
         node_lookup[name] = node
 
-    # set up edges with distance
-    for u, v in graph.edges:
-        u_geom = node_lookup[u]['geometry']['coordinates']
-        v_geom = node_lookup[v]['geometry']['coordinates']
-        graph.edges[u, v]['weight'] = distance(u_geom, v_geom)
+    # set up edges with distance, all pairs in one call
+    edges = list(graph.edges)
+    u_geoms = [node_lookup[u]['geometry']['coordinates'] for u, v in edges]
+    v_geoms = [node_lookup[v]['geometry']['coordinates'] for u, v in edges]
+    for (u, v), weight in zip(edges, distances(u_geoms, v_geoms).tolist()):
+        graph.edges[u, v]['weight'] = weight
 
     # print complete graph with distances
     print(list(graph.edges(data=True)))
@@ -82,7 +84,9 @@ def main():
 
 
 def distance(a, b):
-    return vincenty(tuple(a), tuple(b)).kilometers
+    """Distance in kilometres between two GeoJSON (lon, lat) coordinates
+    """
+    return distances([a], [b])[0]
 
 if __name__ == '__main__':
     main()
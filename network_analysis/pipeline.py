@@ -0,0 +1,216 @@
+"""Access network layers for many sites in one run.
+
+The demo scripts each cover one layer for one site: premises to their
+distribution point (``reprex``, ``mst_only``) and distribution points to
+their cabinet (``draw_graph``, ``min_span_tree``). ``run`` does every layer
+for every cabinet:
+
+1. read premises, distribution points and cabinets with ``ingest``
+2. split them into catchments, one per cabinet, by following each
+   feature's ``link`` property to the ``name`` of its parent
+3. for each catchment, build a geodesic minimum spanning tree from each
+   distribution point to its premises, then one from the cabinet to its
+   distribution points (``euclidean_mst``)
+
+Both layers are straight-line trees, as in ``mst_only``. The road-following
+premises layer of ``single_source_with_roads`` and ``reprex`` is left out
+on purpose: it needs a road network snapped to every site, while this run
+needs only the three point layers. Road trees for a catchment can be built
+from its result with ``single_source_with_roads.shortest_path_trees``.
+
+Catchments do not depend on each other, so they are spread over a process
+pool. Each result is written as one line of newline-delimited JSON as soon
+as it finishes.
+"""
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy
+
+from euclidean_mst import euclidean_mst_from_coords
+from ingest import load_points
+
+logger = logging.getLogger(__name__)
+
+
+def group_indices(links):
+    """Positions of each value in ``links``, in one pass.
+
+    Returns
+    -------
+    dict
+        Value to a list of positions, in order.
+
+    """
+    groups = {}
+    for i, link in enumerate(links.tolist() if hasattr(links, 'tolist') else links):
+        groups.setdefault(link, []).append(i)
+    return groups
+
+
+def catchments(premises, distribution_points, cabinets):
+    """Split the layers into one catchment per cabinet.
+
+    Parameters
+    ----------
+    premises, distribution_points, cabinets : tuple
+        ``(coords, values)`` as from ``ingest.load_points``, with ``name``
+        values for all three and ``link`` values for premises and
+        distribution points.
+
+    Yields
+    ------
+    dict
+        ``cabinet`` (name and coordinates) and ``distribution_points``: a
+        list of dicts of a distribution point's name and coordinates with
+        its premises' names and coordinates. Distribution points with no
+        premises are kept; features linked to a missing parent are not.
+        Features with null geometries (NaN coordinates) are dropped, with a
+        warning.
+
+    """
+    premises_coords, premises_values = _drop_missing_points(premises, 'premises')
+    dp_coords, dp_values = _drop_missing_points(distribution_points, 'distribution points')
+    cabinet_coords, cabinet_values = _drop_missing_points(cabinets, 'cabinets')
+
+    premises_by_dp = group_indices(premises_values['link'])
+    dps_by_cabinet = group_indices(dp_values['link'])
+    premises_names = premises_values['name']
+    dp_names = dp_values['name']
+
+    for i, cabinet in enumerate(cabinet_values['name'].tolist()):
+        dps = []
+        for j in dps_by_cabinet.get(cabinet, []):
+            members = premises_by_dp.get(dp_names[j], [])
+            dps.append({
+                'name': dp_names[j],
+                'coords': dp_coords[j],
+                'premises': premises_names[members].tolist(),
+                'premises_coords': premises_coords[members],
+            })
+        yield {
+            'cabinet': {'name': cabinet, 'coords': cabinet_coords[i]},
+            'distribution_points': dps,
+        }
+
+
+def _drop_missing_points(layer, label):
+    """Rows of a ``(coords, values)`` layer with finite coordinates.
+    """
+    coords, values = layer
+    keep = numpy.isfinite(coords).all(axis=1)
+    n_missing = len(keep) - int(keep.sum())
+    if not n_missing:
+        return coords, values
+    logger.warning('dropping %d %s with no geometry', n_missing, label)
+    return coords[keep], {field: column[keep] for field, column in values.items()}
+
+
+def solve_catchment(catchment):
+    """Spanning trees for every layer of one catchment.
+
+    Returns
+    -------
+    dict
+        ``cabinet`` name, ``premises`` trees by distribution point and the
+        ``distribution_points`` tree, each as ``[u, v, km]`` edges, and the
+        total ``length_km`` of all trees.
+
+    """
+    cabinet = catchment['cabinet']
+    premises_trees = {}
+    total = 0.0
+
+    for dp in catchment['distribution_points']:
+        ids = [dp['name']] + dp['premises']
+        coords = numpy.vstack(([dp['coords']], numpy.reshape(dp['premises_coords'], (-1, 2))))
+        tree = euclidean_mst_from_coords(ids, coords, geodesic=True)
+        premises_trees[dp['name']] = tree
+        total += sum(w for _, _, w in tree)
+
+    dps = catchment['distribution_points']
+    ids = [cabinet['name']] + [dp['name'] for dp in dps]
+    coords = numpy.vstack([cabinet['coords']] + [dp['coords'] for dp in dps])
+    dp_tree = euclidean_mst_from_coords(ids, coords, geodesic=True)
+    total += sum(w for _, _, w in dp_tree)
+
+    return {
+        'cabinet': cabinet['name'],
+        'premises': premises_trees,
+        'distribution_points': dp_tree,
+        'length_km': round(total, 4),
+    }
+
+
+def run(premises_path, distribution_points_path, cabinets_path, output_path,
+        workers=None, chunk_size=100000):
+    """Build every layer for every cabinet and stream results to disk.
+
+    Parameters
+    ----------
+    premises_path, distribution_points_path, cabinets_path : str
+        Point layers in any format ``ingest.read_points`` reads. All need a
+        ``name`` property, and premises and distribution points a ``link``
+        to the name of their parent.
+    output_path : str
+        Newline-delimited JSON file, one ``solve_catchment`` result per
+        line, in the order catchments finish.
+    workers : int, optional
+        Number of worker processes. Runs in-process if not given or 1.
+    chunk_size : int, optional
+        Features per chunk when reading.
+
+    Returns
+    -------
+    int
+        Number of catchments written.
+
+    """
+    start = time.perf_counter()
+    fields = ('name', 'link')
+    layers = [
+        load_points(path, fields, chunk_size)
+        for path in (premises_path, distribution_points_path, cabinets_path)
+    ]
+    logger.info(
+        'read %d premises, %d distribution points, %d cabinets in %.1fs',
+        *[len(coords) for coords, _ in layers], time.perf_counter() - start
+    )
+
+    n_done = 0
+    with open(output_path, 'w') as output:
+        if workers is None or workers <= 1:
+            results = (solve_catchment(c) for c in catchments(*layers))
+            for result in results:
+                output.write(json.dumps(result) + '\n')
+                n_done += 1
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(solve_catchment, c) for c in catchments(*layers)]
+                for future in as_completed(futures):
+                    output.write(json.dumps(future.result()) + '\n')
+                    output.flush()
+                    n_done += 1
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        'wrote %d catchments to %s in %.1fs (%.1f catchments/s)',
+        n_done, output_path, elapsed, n_done / elapsed if elapsed else float('inf')
+    )
+    return n_done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('premises')
+    parser.add_argument('distribution_points')
+    parser.add_argument('cabinets')
+    parser.add_argument('output')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run(args.premises, args.distribution_points, args.cabinets, args.output, workers=args.workers)
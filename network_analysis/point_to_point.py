@@ -0,0 +1,293 @@
+"""Single source, single sink shortest paths over road graphs.
+
+A full Dijkstra search from a source settles every node closer than the
+sink, a disc around the source. For a single sink, two searches can settle
+far fewer nodes:
+
+- ``astar`` orders the search by distance so far plus a lower bound on the
+  distance left, using node coordinates. The bound is the straight-line
+  (chord) distance between the two points in 3D, on the same ellipsoid as
+  ``line_length``. A chord is never longer than any curve over the surface
+  between the same points. A road edge's length is a sum of geodesic
+  segments, so it is never shorter than the chord between its ends. The
+  bound is therefore admissible and consistent, and A* returns the same
+  path length as Dijkstra. A great-circle distance on the mean sphere is not
+  a safe bound here: it can come out slightly longer than the ellipsoidal
+  lengths on the edges.
+- ``bidirectional`` runs Dijkstra from both ends at once and stops when the
+  two discs meet. It needs no coordinates.
+
+Each search returns the path length, the path as a list of nodes and the
+number of nodes it settled.
+"""
+import math
+import time
+from heapq import heappush, heappop
+from itertools import count
+
+from distance import ELLIPSOIDS, EARTH_RADIUS_KM
+
+
+def dijkstra(G, source, target, weight='length'):
+    """Dijkstra from source, stopping once target is settled.
+
+    Returns
+    -------
+    tuple
+        ``(length, path, settled)``
+
+    """
+    G_succ = G.succ if G.is_directed() else G.adj
+
+    dist = {}
+    seen = {source: 0}
+    pred = {source: None}
+    c = count()
+    fringe = [(0, next(c), source)]
+
+    while fringe:
+        (d, _, v) = heappop(fringe)
+        if v in dist:
+            continue
+        dist[v] = d
+        if v == target:
+            return d, _path(pred, target), len(dist)
+
+        for u, e in G_succ[v].items():
+            cost = e.get(weight)
+            if cost is None or u in dist:
+                continue
+            vu_dist = d + cost
+            if u not in seen or vu_dist < seen[u]:
+                seen[u] = vu_dist
+                pred[u] = v
+                heappush(fringe, (vu_dist, next(c), u))
+
+    raise _no_path(source, target)
+
+
+def astar(G, source, target, weight='length', pos='pos', ellipsoid='WGS-84', method='vincenty'):
+    """A* search guided by the chord distance to target.
+
+    Parameters
+    ----------
+    G : networkx.Graph
+        Graph whose nodes have a ``pos`` attribute of ``(lon, lat)`` in
+        degrees, with edge lengths in kilometres.
+    source, target : node
+    weight : str, optional
+        Edge attribute holding lengths.
+    pos : str, optional
+        Node attribute holding coordinates.
+    ellipsoid, method : str, optional
+        As used for the edge lengths (see ``line_length``). For
+        ``'haversine'`` lengths the bound is the chord on the mean sphere.
+
+    Returns
+    -------
+    tuple
+        ``(length, path, settled)``
+
+    """
+    G_succ = G.succ if G.is_directed() else G.adj
+    nodes = G.nodes
+
+    if method == 'haversine':
+        a = b = EARTH_RADIUS_KM
+    else:
+        a, b, _ = ELLIPSOIDS[ellipsoid]
+    e2 = 1 - (b * b) / (a * a)
+
+    tx, ty, tz = _ecef(nodes[target][pos], a, e2)
+    # shrink the bound a little so rounding in the lengths can never make
+    # it overestimate on very short edges
+    scale = 1 - 1e-9
+    bounds = {}
+
+    def bound(v):
+        h = bounds.get(v)
+        if h is None:
+            x, y, z = _ecef(nodes[v][pos], a, e2)
+            h = bounds[v] = scale * math.sqrt((x - tx) ** 2 + (y - ty) ** 2 + (z - tz) ** 2)
+        return h
+
+    dist = {}
+    seen = {source: 0}
+    pred = {source: None}
+    c = count()
+    fringe = [(bound(source), next(c), 0, source)]
+
+    while fringe:
+        (_, _, d, v) = heappop(fringe)
+        if v in dist:
+            continue
+        dist[v] = d
+        if v == target:
+            return d, _path(pred, target), len(dist)
+
+        for u, e in G_succ[v].items():
+            cost = e.get(weight)
+            if cost is None or u in dist:
+                continue
+            vu_dist = d + cost
+            if u not in seen or vu_dist < seen[u]:
+                seen[u] = vu_dist
+                pred[u] = v
+                heappush(fringe, (vu_dist + bound(u), next(c), vu_dist, u))
+
+    raise _no_path(source, target)
+
+
+def bidirectional(G, source, target, weight='length'):
+    """Dijkstra from source and target in turn until the searches meet.
+
+    Returns
+    -------
+    tuple
+        ``(length, path, settled)``, where ``settled`` counts both searches.
+
+    """
+    if source == target:
+        return 0, [source], 1
+
+    if G.is_directed():
+        succs = (G.succ, G.pred)
+    else:
+        succs = (G.adj, G.adj)
+
+    dists = ({}, {})
+    seens = ({source: 0}, {target: 0})
+    preds = ({source: None}, {target: None})
+    c = count()
+    fringes = ([(0, next(c), source)], [(0, next(c), target)])
+
+    best = float('inf')
+    meet = None
+    direction = 1
+    while fringes[0] and fringes[1]:
+        # the smaller frontier goes next, which keeps the two discs balanced
+        direction = 0 if len(fringes[0]) <= len(fringes[1]) else 1
+        fringe = fringes[direction]
+        dist = dists[direction]
+        seen = seens[direction]
+        pred = preds[direction]
+        other_seen = seens[1 - direction]
+
+        (d, _, v) = heappop(fringe)
+        if v in dist:
+            continue
+        dist[v] = d
+
+        # no path through an unsettled node can beat the best meeting point
+        # once the two nearest frontiers are at least that far apart
+        if fringes[1 - direction] and d + fringes[1 - direction][0][0] >= best:
+            break
+
+        for u, e in succs[direction][v].items():
+            cost = e.get(weight)
+            if cost is None or u in dist:
+                continue
+            vu_dist = d + cost
+            if u not in seen or vu_dist < seen[u]:
+                seen[u] = vu_dist
+                pred[u] = v
+                heappush(fringe, (vu_dist, next(c), u))
+                if u in other_seen and vu_dist + other_seen[u] < best:
+                    best = vu_dist + other_seen[u]
+                    meet = u
+
+    if meet is None:
+        raise _no_path(source, target)
+
+    path = _path(preds[0], meet)
+    u = preds[1][meet]
+    while u is not None:
+        path.append(u)
+        u = preds[1][u]
+    return best, path, len(dists[0]) + len(dists[1])
+
+
+METHODS = {
+    'dijkstra': dijkstra,
+    'astar': astar,
+    'bidirectional': bidirectional,
+}
+
+
+def _ecef(lonlat, a, e2):
+    """Earth-centred cartesian coordinates of a lon/lat point on an
+    ellipsoid with semi-major axis ``a`` and eccentricity squared ``e2``.
+    """
+    lon, lat = math.radians(lonlat[0]), math.radians(lonlat[1])
+    sin_lat = math.sin(lat)
+    cos_lat = math.cos(lat)
+    n = a / math.sqrt(1 - e2 * sin_lat * sin_lat)
+    return (
+        n * cos_lat * math.cos(lon),
+        n * cos_lat * math.sin(lon),
+        n * (1 - e2) * sin_lat
+    )
+
+
+def _path(pred, target):
+    path = []
+    v = target
+    while v is not None:
+        path.append(v)
+        v = pred[v]
+    path.reverse()
+    return path
+
+
+def _no_path(source, target):
+    import networkx
+    return networkx.NetworkXNoPath('no path between {} and {}'.format(source, target))
+
+
+def benchmark(side=200, n_queries=50, seed=0):
+    """Compare nodes settled and time per query on a perturbed lon/lat grid,
+    with edges weighted by ellipsoidal length as in ``line_length``.
+    """
+    import random
+
+    import networkx
+    import numpy
+
+    from distance import distances
+
+    rng = numpy.random.default_rng(seed)
+    G = networkx.grid_2d_graph(side, side)
+    # about 20 m spacing around Cambridge, jittered so ties are rare
+    for (i, j), jitter in zip(list(G), rng.normal(0, 0.00003, (len(G), 2))):
+        G.nodes[i, j]['pos'] = (0.1 + i * 0.0003 + jitter[0], 52.2 + j * 0.0002 + jitter[1])
+    edges = list(G.edges)
+    a = numpy.array([G.nodes[u]['pos'] for u, _ in edges])
+    b = numpy.array([G.nodes[v]['pos'] for _, v in edges])
+    # roads are rarely straight; stretch edges by up to a fifth
+    lengths = distances(a, b) * rng.uniform(1, 1.2, len(edges))
+    for (u, v), length in zip(edges, lengths.tolist()):
+        G.edges[u, v]['length'] = length
+
+    random.seed(seed)
+    nodes = list(G)
+    queries = [tuple(random.sample(nodes, 2)) for _ in range(n_queries)]
+
+    print('{} nodes, {} edges, {} queries'.format(len(G), G.number_of_edges(), n_queries))
+    print('{:>14} {:>16} {:>12}'.format('method', 'settled/query', 'ms/query'))
+    expected = None
+    for name, search in METHODS.items():
+        start = time.perf_counter()
+        results = [search(G, source, target) for source, target in queries]
+        elapsed = time.perf_counter() - start
+
+        lengths = [length for length, _, _ in results]
+        if expected is None:
+            expected = lengths
+        assert all(abs(x - y) < 1e-9 for x, y in zip(lengths, expected)), name
+
+        settled = sum(s for _, _, s in results) / n_queries
+        print('{:>14} {:>16.0f} {:>12.2f}'.format(name, settled, elapsed / n_queries * 1e3))
+
+
+if __name__ == '__main__':
+    benchmark()
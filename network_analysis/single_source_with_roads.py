@@ -1,14 +1,26 @@
+import logging
+import time
+
 import geopandas
 import matplotlib.pyplot
 import snkit
 import networkx
 
-from shapely.geometry import shape
-from geopy.distance import vincenty
-from boltons.iterutils import pairwise
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from heapq import heappush, heappop
 from itertools import count
 
+import numpy
+import pandas
+import shapely
+
+from csr_graph import CSRGraph, compile_graph, dijkstra as csr_dijkstra
+from distance import distances
+from point_to_point import METHODS as POINT_TO_POINT_METHODS
+from snap import link_nodes_to_nearest_edge
+
+logger = logging.getLogger(__name__)
+
 PREMISES = [
     {
         "type": "Feature",
@@ -87,7 +99,7 @@ def main():
 
     # snap to nearest edge
     print("\n# snap to nearest edge\n")
-    network = snkit.network.link_nodes_to_nearest_edge(network)
+    network = link_nodes_to_nearest_edge(network)
 
     # add node ids and edge to_id/from_id
     network = snkit.network.add_ids(network)
@@ -99,62 +111,141 @@ def main():
     # approx min tree
 
     # construct graph
-    edges = list(network.edges.iterfeatures())
-    nodes = list(network.nodes.iterfeatures())
-    graph = networkx.Graph()
-    for node in nodes:
-        graph.add_node(node['properties']['id'], **node['properties'])
-    for edge in edges:
-        graph.add_edge(
-            edge['properties']['from_id'],
-            edge['properties']['to_id'],
-            length=line_length(shape(edge['geometry']))
-        )
+    graph = graph_from_network(network)
 
-    source_id = None
-    sink_ids = []
-    for node in nodes:
-        if node['properties']['name'] == 'distribution_point':
-            source_id = node['properties']['id']
-        if node['properties']['name'] in ['premises_1', 'premises_2', 'premises_3']:
-            sink_ids.append(node['properties']['id'])
+    names = network.nodes['name']
+    source_id = network.nodes.loc[names == 'distribution_point', 'id'].iloc[0]
+    sink_ids = network.nodes.loc[
+        names.isin(['premises_1', 'premises_2', 'premises_3']), 'id'].tolist()
 
     # key function - uses shortest paths over network, but deduplicated
-    tree = shortest_path_tree(graph, source_id, sink_ids)
+    compiled = compile_graph(graph, weight='length')
+    tree = shortest_path_tree(graph, source_id, sink_ids, compiled=compiled)
 
     print(tree.nodes)  # node ids
     print(tree.edges)  # edges as from-to node ids
 
     # recover features
-    tree_nodes = [
-        node for node in nodes
-        if node['properties']['id'] in tree.nodes
-    ]
-
-    tree_edges = []
-    for edge in edges:
-        a = edge['properties']['from_id']
-        b = edge['properties']['to_id']
-
-        if (a, b) in tree.edges or (b, a) in tree.edges:
-            tree_edges.append(edge)
+    tree_nodes = network.nodes.iloc[sorted(graph.nodes[n]['row'] for n in tree.nodes)]
+    tree_edges = network.edges.iloc[sorted(row for _, _, row in tree.edges(data='row'))]
 
     # as gdf again for ease of plotting
-    network = snkit.Network(
-        geopandas.GeoDataFrame.from_features(tree_nodes),
-        geopandas.GeoDataFrame.from_features(tree_edges)
-    )
+    network = snkit.Network(tree_nodes, tree_edges)
     plot(network)
     print(tree_edges)
     print(tree_nodes)
 
-def shortest_path_tree(G, source, sinks):
+def graph_from_network(network, csr=False):
+    """Build a graph straight from a snkit network's node and edge tables
+
+    Edge lengths are computed for all edges at once from the geometry
+    arrays, and edges come from the `from_id`/`to_id` columns without going
+    through GeoJSON features.
+
+    Args:
+        network: snkit Network with `id` node ids and `from_id`/`to_id`
+            edge topology (see `snkit.network.add_topology`).
+        csr: return a `csr_graph.CSRGraph` instead of a networkx graph.
+    Returns:
+        networkx.Graph keyed by node id, with node attributes from the node
+        table plus `pos` (lon, lat) and `row`, and edge attributes `length`
+        (km) and `row`. Or a CSRGraph over the same node ids and lengths.
+    """
+    start = time.perf_counter()
+    nodes = network.nodes
+    edges = network.edges
+
+    node_ids = nodes['id'].tolist()
+    lengths = line_lengths(edges.geometry)
+    from_ids = edges['from_id'].to_numpy()
+    to_ids = edges['to_id'].to_numpy()
+
+    if csr:
+        index = pandas.Index(node_ids)
+        from_i = index.get_indexer(from_ids)
+        to_i = index.get_indexer(to_ids)
+        if (from_i < 0).any() or (to_i < 0).any():
+            raise ValueError('edges refer to node ids missing from network.nodes')
+
+        # both directions, grouped by source node
+        tails = numpy.concatenate((from_i, to_i))
+        heads = numpy.concatenate((to_i, from_i))
+        order = numpy.argsort(tails, kind='stable')
+        indptr = numpy.zeros(len(node_ids) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(tails, minlength=len(node_ids)), out=indptr[1:])
+        graph = CSRGraph(node_ids, indptr, heads[order], numpy.concatenate((lengths, lengths))[order])
+    else:
+        # row is each feature's position in network.nodes / network.edges, so
+        # the tree can be turned back into features with a single .iloc
+        attributes = nodes.drop(columns=nodes.geometry.name).to_dict('records')
+        # pos (lon, lat) is used by the A* search heuristic
+        pos = shapely.get_coordinates(nodes.geometry.values)[:, :2].tolist()
+        for row, (data, xy) in enumerate(zip(attributes, pos)):
+            data['pos'] = tuple(xy)
+            data['row'] = row
+
+        graph = networkx.Graph()
+        graph.add_nodes_from(zip(node_ids, attributes))
+        graph.add_edges_from(
+            (a, b, {'length': length, 'row': row})
+            for row, (a, b, length) in enumerate(zip(from_ids.tolist(), to_ids.tolist(), lengths.tolist()))
+        )
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        'built graph of %d nodes, %d edges in %.2fs (%.2fs per million edges)',
+        len(node_ids), len(edges), elapsed, elapsed / max(len(edges), 1) * 1e6
+    )
+    return graph
+
+def shortest_path_tree(G, source, sinks, compiled=None, engine='python', method='dijkstra',
+                       hierarchy=None):
     """Shortest path tree through a graph from source to sinks
 
     Based on networkx omplementation of Dijkstra's algorithm
     (see https://networkx.github.io/documentation/networkx-1.10/_modules/networkx/algorithms/shortest_paths/weighted.html)
 
+    Pass `compiled`, a `csr_graph.CSRGraph` made once from G with
+    `compile_graph(G)`, to run the same search over flat arrays instead of
+    G's adjacency dicts. `engine` picks the search used on the compiled
+    graph (see `csr_graph.dijkstra`).
+
+    With a single sink, `method` can be 'astar' (needs `pos` node
+    attributes) or 'bidirectional' to settle fewer nodes than a full
+    Dijkstra search (see `point_to_point`). These search G itself, so they
+    cannot be combined with `compiled` or `hierarchy`.
+
+    Pass `hierarchy`, a `contraction_hierarchy.ContractionHierarchy` built
+    once from G (and saved to disk with `save`), to answer from the
+    hierarchy instead of searching G.
+
+    Tree edges carry the `row` attribute of the graph edge they follow,
+    where it has one.
+
     """
+    if method != 'dijkstra':
+        if method not in POINT_TO_POINT_METHODS:
+            raise ValueError("method must be one of {}, not {!r}".format(
+                sorted(POINT_TO_POINT_METHODS), method))
+        if len(sinks) != 1:
+            raise ValueError("method {!r} needs exactly one sink".format(method))
+        if compiled is not None or hierarchy is not None:
+            raise ValueError("method {!r} searches G; it cannot use compiled or hierarchy".format(method))
+        _, path, _ = POINT_TO_POINT_METHODS[method](G, source, sinks[0])
+        tree = networkx.Graph()
+        tree.add_node(source)
+        networkx.add_path(tree, path)
+    elif hierarchy is not None:
+        tree = hierarchy.shortest_path_tree(source, sinks)
+    elif compiled is not None:
+        tree = _compiled_shortest_path_tree(compiled, source, sinks, engine)
+    else:
+        tree = _dijkstra_tree(G, source, sinks)
+
+    _copy_edge_rows(G, tree)
+    return tree
+
+def _dijkstra_tree(G, source, sinks):
     G_succ = G.succ if G.is_directed() else G.adj
 
     push = heappush
@@ -206,6 +297,8 @@ def shortest_path_tree(G, source, sinks):
     # work back from targets through their predecessors
     tree = networkx.Graph()
     for u in sinks:
+        if u not in dist:
+            raise networkx.NetworkXNoPath('Node {} not reachable from {}'.format(u, source))
         tree.add_node(u)
         while True:
             v = pred[u][0]
@@ -217,30 +310,163 @@ def shortest_path_tree(G, source, sinks):
 
     return tree
 
-def line_length(line, ellipsoid='WGS-84'):
-    """Length of a line in meters, given in geographic coordinates.
+def _copy_edge_rows(G, tree):
+    """Copy the `row` attribute of each graph edge onto the tree edge, so
+    features can be recovered by position without searching the network.
+    """
+    for u, v, data in tree.edges(data=True):
+        row = G.edges[u, v].get('row')
+        if row is not None:
+            data['row'] = row
+
+def _compiled_shortest_path_tree(compiled, source, sinks, engine):
+    index = compiled.index
+    nodes = compiled.nodes
+    source_i = index[source]
+    dist, pred = csr_dijkstra(compiled, source_i, [index[u] for u in sinks], engine=engine)
+
+    # work back from targets through their predecessors
+    tree = networkx.Graph()
+    for sink in sinks:
+        u = index[sink]
+        if u != source_i and (pred[u] < 0 or dist[u] == numpy.inf):
+            raise networkx.NetworkXNoPath('Node {} not reachable from {}'.format(sink, source))
+        tree.add_node(sink)
+        while u != source_i:
+            v = int(pred[u])
+            tree.add_edge(nodes[v], nodes[u])
+            u = v
+
+    return tree
+
+# compiled graph held by each pool worker, set once by _init_tree_worker
+_worker_graph = None
+
+def _init_tree_worker(compiled):
+    global _worker_graph
+    _worker_graph = compiled
+
+def _tree_task(source, sinks, engine):
+    tree = _compiled_shortest_path_tree(_worker_graph, source, sinks, engine)
+    return source, list(tree.nodes), list(tree.edges)
+
+def shortest_path_trees(G, sources_sinks, workers=None, engine='python', compiled=None):
+    """Shortest path trees for many sources, each to its own sinks
+
+    Compiles G once (see `csr_graph.compile_graph`) and yields trees as they
+    finish, so results can be written out while the rest are computed.
+
+    Args:
+        G: networkx graph with `length` edge attributes.
+        sources_sinks: dict of source node -> list of sink nodes.
+        workers: number of worker processes; runs in-process if not given or 1.
+        engine: search engine on the compiled graph (see `csr_graph.dijkstra`).
+        compiled: a `CSRGraph` already compiled from G, if there is one.
+    Yields:
+        (source, tree) pairs, in order of completion when using workers.
+    Raises:
+        networkx.NetworkXNoPath: if a sink cannot be reached from its
+            source. Sources still queued in the pool are cancelled.
+    """
+    if compiled is None:
+        compiled = compile_graph(G, weight='length')
+
+    start = time.perf_counter()
+    n_done = 0
+
+    if workers is None or workers <= 1:
+        for source, sinks in sources_sinks.items():
+            tree = _compiled_shortest_path_tree(compiled, source, sinks, engine)
+            _copy_edge_rows(G, tree)
+            yield source, tree
+            n_done += 1
+    else:
+        # the compiled graph goes to each worker once, at start-up
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_tree_worker,
+            initargs=(compiled,)
+        )
+        with executor:
+            futures = [
+                executor.submit(_tree_task, source, sinks, engine)
+                for source, sinks in sources_sinks.items()
+            ]
+            try:
+                for future in as_completed(futures):
+                    # re-raises any error from the worker, e.g. NetworkXNoPath
+                    source, nodes, edges = future.result()
+                    tree = networkx.Graph()
+                    tree.add_nodes_from(nodes)
+                    tree.add_edges_from(edges)
+                    _copy_edge_rows(G, tree)
+                    yield source, tree
+                    n_done += 1
+            except BaseException:
+                # don't wait on queued sources before passing the error on
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        '%d shortest path trees in %.2fs (%.1f sources/s)',
+        n_done, elapsed, n_done / elapsed if elapsed else float('inf')
+    )
+
+def line_length(line, ellipsoid='WGS-84', method='vincenty'):
+    """Length of a line in kilometers, given in geographic coordinates.
 
     Adapted from https://gis.stackexchange.com/questions/4022/looking-for-a-pythonic-way-to-calculate-the-length-of-a-wkt-linestring#answer-115285
 
     Args:
         line: a shapely LineString object with WGS-84 coordinates.
-        ellipsoid: string name of an ellipsoid that `geopy` understands
-            (see http://geopy.readthedocs.io/en/latest/#module-geopy.distance).
+        ellipsoid: string name of an ellipsoid in `distance.ELLIPSOIDS`
+            (the same names `geopy` understands).
+        method: 'vincenty' (ellipsoidal) or 'haversine' (spherical).
     Returns:
         Length of line in kilometers.
 
     Depends on:
-        from geopy.distance import vincenty
-        from boltons.iterutils import pairwise
+        from distance import distances
     """
 
-    if line.geometryType() == 'MultiLineString':
-        return sum(line_length(segment) for segment in line)
+    if line.geom_type == 'MultiLineString':
+        return sum(line_length(segment, ellipsoid, method) for segment in line.geoms)
 
-    return sum(
-        vincenty(tuple(reversed(a)), tuple(reversed(b)), ellipsoid=ellipsoid).kilometers
-        for a, b in pairwise(line.coords)
-    )
+    # all segments of the line in one vectorised call
+    coords = numpy.asarray(line.coords)[:, :2]
+    return float(distances(coords[:-1], coords[1:], method=method, ellipsoid=ellipsoid).sum())
+
+def line_lengths(geoseries, ellipsoid='WGS-84', method='vincenty'):
+    """Lengths in kilometers of many lines at once, given in geographic coordinates.
+
+    Vectorised `line_length`: the coordinates of all lines are pulled out as
+    one ragged array and every segment is measured in a single call.
+
+    Args:
+        geoseries: GeoSeries or array of shapely LineStrings and
+            MultiLineStrings with WGS-84 coordinates.
+        ellipsoid: string name of an ellipsoid in `distance.ELLIPSOIDS`.
+        method: 'vincenty' (ellipsoidal) or 'haversine' (spherical).
+    Returns:
+        numpy float array of lengths in kilometers, in input order, ready to
+        assign to a `length` column. Missing or empty geometries have length 0.
+    """
+    geometries = numpy.asarray(getattr(geoseries, 'values', geoseries), dtype=object)
+
+    # split multi-part lines so no segment joins the end of one part to the
+    # start of the next; owner maps each part back to its input row
+    parts, owner = shapely.get_parts(geometries, return_index=True)
+    coords, part = shapely.get_coordinates(parts, return_index=True)
+
+    # consecutive coordinates of the same part are its segments
+    same = part[:-1] == part[1:]
+    segment_lengths = distances(coords[:-1][same], coords[1:][same], method=method, ellipsoid=ellipsoid)
+    return numpy.bincount(
+        owner[part[:-1][same]],
+        weights=segment_lengths,
+        minlength=len(geometries)
+    ).astype(numpy.float64)
 
 def plot(network):
     fig, ax = matplotlib.pyplot.subplots()
@@ -0,0 +1,265 @@
+"""Link nodes to their nearest network edge, in bulk.
+
+``link_nodes_to_nearest_edge`` is a drop-in replacement for
+``snkit.network.link_nodes_to_nearest_edge`` and builds the same topology
+(see ``split_edges_at_nodes`` for where edge geometries can differ).
+snkit queries a spatial index, interpolates and splits one node and one
+edge at a time. Here the work is done in a few array operations:
+
+1. one STRtree over the edges, queried for the nearest edge of every node
+   at once (optionally in chunks across worker processes)
+2. the nearest point on each edge, with ``line_locate_point`` and
+   ``line_interpolate_point`` over all nodes
+3. new nodes at those points and link edges from each node to its point,
+   with duplicate geometries dropped as snkit does
+4. every edge split at the nodes lying on it, found with one STRtree
+   ``dwithin`` query; only edges that have a node part way along them are
+   rebuilt, and split points keep the node's exact coordinates
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import pandas
+import shapely
+from snkit import Network
+
+logger = logging.getLogger(__name__)
+
+# state shared with worker processes, set once per worker by _init_worker
+_worker_state = None
+
+
+def _init_worker(edge_geoms):
+    global _worker_state
+    _worker_state = (edge_geoms, shapely.STRtree(edge_geoms))
+
+
+def _nearest_chunk(points, state=None):
+    """Nearest edge and nearest point on it for each of ``points``.
+    """
+    edge_geoms, tree = state if state is not None else _worker_state
+    nearest = tree.query_nearest(points, all_matches=False)
+    # query_nearest returns (point, edge) pairs, in point order
+    edge_i = numpy.full(len(points), -1, dtype=numpy.int64)
+    edge_i[nearest[0]] = nearest[1]
+
+    lines = edge_geoms[edge_i]
+    snapped = shapely.line_interpolate_point(lines, shapely.line_locate_point(lines, points))
+    return edge_i, snapped
+
+
+def nearest_edges(network, workers=None, chunk_size=100000):
+    """Nearest edge and the nearest point on it for every node.
+
+    Parameters
+    ----------
+    network : snkit.Network
+    workers : int, optional
+        Number of worker processes to spread chunks of nodes over. Runs
+        in-process if not given or 1.
+    chunk_size : int, optional
+        Nodes per chunk sent to a worker.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Edge positions in ``network.edges`` and shapely points.
+
+    """
+    edge_geoms = network.edges.geometry.values.to_numpy()
+    points = network.nodes.geometry.values.to_numpy()
+
+    if workers is None or workers <= 1 or len(points) <= chunk_size:
+        return _nearest_chunk(points, (edge_geoms, shapely.STRtree(edge_geoms)))
+
+    chunks = [points[i:i + chunk_size] for i in range(0, len(points), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(edge_geoms,)) as executor:
+        results = list(executor.map(_nearest_chunk, chunks))
+    return (
+        numpy.concatenate([edge_i for edge_i, _ in results]),
+        numpy.concatenate([snapped for _, snapped in results])
+    )
+
+
+def link_nodes_to_nearest_edge(network, condition=None, workers=None, chunk_size=100000,
+                               tolerance=1e-9):
+    """Link each node to the nearest point on its nearest edge.
+
+    Parameters
+    ----------
+    network : snkit.Network
+    condition : callable, optional
+        ``condition(node, edge)`` as in snkit, called with the node's
+        ``itertuples`` row and the edge's row. Nodes for which it is false
+        are not linked.
+    workers, chunk_size : int, optional
+        See ``nearest_edges``.
+    tolerance : float, optional
+        Distance within which a node splits an edge, as in snkit.
+
+    Returns
+    -------
+    snkit.Network
+        Nodes with a new node at each snapped point, and edges with a link
+        edge from each node to its point, all split where nodes lie on them.
+
+    """
+    start = time.perf_counter()
+    nodes = network.nodes
+    edges = network.edges
+
+    edge_i, snapped = nearest_edges(network, workers, chunk_size)
+    node_geoms = nodes.geometry.values.to_numpy()
+
+    linked = ~shapely.equals_exact(snapped, node_geoms, tolerance=0)
+    if condition is not None:
+        linked &= numpy.array([
+            condition(node, edges.iloc[i])
+            for node, i in zip(nodes.itertuples(index=False), edge_i.tolist())
+        ], dtype=bool)
+
+    new_points = snapped[linked]
+    links = shapely.linestrings(numpy.stack((
+        shapely.get_coordinates(node_geoms[linked]),
+        shapely.get_coordinates(new_points)
+    ), axis=1))
+
+    all_nodes = _concat_dedup(nodes, new_points)
+    all_edges = _concat_dedup(edges, links)
+    result = split_edges_at_nodes(Network(nodes=all_nodes, edges=all_edges), tolerance)
+
+    logger.info(
+        'linked %d of %d nodes to %d edges in %.2fs',
+        linked.sum(), len(nodes), len(edges), time.perf_counter() - start
+    )
+    return result
+
+
+def _concat_dedup(gdf, geoms):
+    """Append geometry-only rows to a GeoDataFrame and drop duplicate
+    geometries, keeping the first, as ``snkit.network.concat_dedup``.
+    """
+    geom_col = gdf.geometry.name
+    new = type(gdf)({geom_col: geoms}, geometry=geom_col, crs=gdf.crs)
+    cat = pandas.concat([gdf, new], axis=0, sort=False, ignore_index=True)
+    duplicated = pandas.Series(shapely.to_wkb(cat.geometry.values.to_numpy())).duplicated()
+    return cat.loc[~duplicated.to_numpy()].reset_index(drop=True)
+
+
+def split_edges_at_nodes(network, tolerance=1e-9):
+    """Split network edges where they intersect node geometries.
+
+    Same nodes, edge rows and attributes as
+    ``snkit.network.split_edges_at_nodes``: each piece keeps its edge's
+    attributes, pieces follow their edge's order, and the index is reset.
+    Piece geometries match snkit's except on lines that fold back over
+    themselves. A node that such a line passes more than once splits it
+    only at the first pass, where ``line_locate_point`` puts it.
+    """
+    edges = network.edges
+    edge_geoms = edges.geometry.values.to_numpy()
+    node_geoms = network.nodes.geometry.values.to_numpy()
+
+    tree = shapely.STRtree(node_geoms)
+    edge_hits, node_hits = tree.query(edge_geoms, predicate='dwithin', distance=tolerance)
+
+    # nodes part way along an edge; those at either end split nothing
+    offsets = shapely.line_locate_point(edge_geoms[edge_hits], node_geoms[node_hits])
+    lengths = shapely.length(edge_geoms[edge_hits])
+    inner = (offsets > tolerance) & (offsets < lengths - tolerance)
+    edge_hits, node_hits, offsets = edge_hits[inner], node_hits[inner], offsets[inner]
+
+    if not len(edge_hits):
+        return Network(nodes=network.nodes, edges=edges.reset_index(drop=True))
+
+    order = numpy.lexsort((offsets, edge_hits))
+    edge_hits, node_hits, offsets = edge_hits[order], node_hits[order], offsets[order]
+    split_coords = [tuple(xy) for xy in shapely.get_coordinates(node_geoms[node_hits]).tolist()]
+    bounds = numpy.flatnonzero(numpy.diff(edge_hits)) + 1
+
+    # row of network.edges for each output edge, and its geometry: either
+    # the original, or a piece to be built with the others at the end
+    rows = []
+    pieces = []
+    piece_coords = []
+    piece_ids = []
+    piece_rows = []
+    previous = 0
+    for group in numpy.split(numpy.arange(len(edge_hits)), bounds):
+        i = int(edge_hits[group[0]])
+        rows.extend(range(previous, i))
+        pieces.extend(edge_geoms[previous:i])
+        segments = _split_line(edge_geoms[i], offsets[group], [split_coords[k] for k in group])
+        for segment in segments:
+            piece_ids.extend([len(piece_rows)] * len(segment))
+            piece_coords.extend(segment)
+            piece_rows.append(len(rows))
+            rows.append(i)
+            pieces.append(None)
+        previous = i + 1
+    rows.extend(range(previous, len(edges)))
+    pieces.extend(edge_geoms[previous:])
+
+    pieces = numpy.array(pieces, dtype=object)
+    built = shapely.linestrings(piece_coords, indices=piece_ids)
+    pieces[piece_rows] = built
+
+    split = edges.iloc[rows].reset_index(drop=True)
+    split[split.geometry.name] = pieces
+    return Network(nodes=network.nodes, edges=split)
+
+
+def _split_line(line, offsets, coords):
+    """Cut a line at increasing distances along it, inserting the given
+    coordinates as the new end and start vertices.
+
+    Returns the pieces as lists of coordinate tuples.
+    """
+    line_coords = [tuple(xy) for xy in shapely.get_coordinates(line).tolist()]
+    along = numpy.concatenate(([0], numpy.cumsum(
+        numpy.hypot(*numpy.diff(numpy.asarray(line_coords), axis=0).T)))).tolist()
+
+    segments = []
+    current = [line_coords[0]]
+    k = 1
+    for offset, point in zip(offsets.tolist(), coords):
+        while k < len(line_coords) and along[k] <= offset:
+            if line_coords[k] != current[-1]:
+                current.append(line_coords[k])
+            k += 1
+        if point != current[-1]:
+            current.append(point)
+        if len(current) > 1:
+            segments.append(current)
+            current = [point]
+    for vertex in line_coords[k:]:
+        if vertex != current[-1]:
+            current.append(vertex)
+    if len(current) > 1:
+        segments.append(current)
+    return segments
+
+
+def benchmark(n_nodes=100000, n_edges=200000, seed=0):
+    """Time linking random nodes to random short edges.
+    """
+    import geopandas
+
+    rng = numpy.random.default_rng(seed)
+    starts = rng.uniform(0, 100, (n_edges, 2))
+    ends = starts + rng.normal(0, 0.2, (n_edges, 2))
+    edges = geopandas.GeoDataFrame(geometry=shapely.linestrings(numpy.stack((starts, ends), axis=1)))
+    nodes = geopandas.GeoDataFrame(geometry=shapely.points(rng.uniform(0, 100, (n_nodes, 2))))
+
+    start = time.perf_counter()
+    result = link_nodes_to_nearest_edge(Network(nodes=nodes, edges=edges))
+    elapsed = time.perf_counter() - start
+    print('{} nodes, {} edges: {:.2f}s ({:.0f} nodes/s), {} edges out'.format(
+        n_nodes, n_edges, elapsed, n_nodes / elapsed, len(result.edges)))
+
+
+if __name__ == '__main__':
+    benchmark()
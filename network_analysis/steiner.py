@@ -0,0 +1,483 @@
+"""Metric closure and Steiner tree approximation for networkx graphs.
+
+The metric closure runs one single-source Dijkstra per terminal, and each
+run stops as soon as every terminal is settled, so the work scales with the
+terminals rather than with the whole graph. Those runs are independent, so
+with ``workers`` they are sharded across a process pool. Each worker
+receives the graph once, when it starts, and sends back rows of a dense
+distance matrix plus an int32 predecessor array per terminal, from which
+paths are rebuilt only when needed.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappush, heappop
+from itertools import chain, count
+
+import networkx as nx
+import numpy
+from networkx.utils import pairwise
+
+
+class MetricClosure(object):
+    """Shortest path distances between terminal nodes of a graph.
+
+    Paths are not stored. Each terminal keeps one predecessor array over the
+    nodes of the graph, and ``path`` rebuilds a path from it on demand.
+
+    Attributes
+    ----------
+    nodes : list
+        Terminal nodes, in matrix order.
+    index : dict
+        Terminal to row/column of ``distance``.
+    distance : numpy.ndarray
+        ``(n, n)`` float64 matrix of shortest path distances.
+    graph_nodes : list
+        Nodes of the graph, in predecessor array order.
+    pred : list of numpy.ndarray
+        For each terminal, an int32 array giving the position in
+        ``graph_nodes`` of each node's predecessor on its shortest path from
+        that terminal, or -1.
+
+    """
+    def __init__(self, nodes, distance, graph_nodes, pred):
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.distance = distance
+        self.graph_nodes = graph_nodes
+        self.graph_index = {node: i for i, node in enumerate(graph_nodes)}
+        self.pred = pred
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def path(self, u, v):
+        """Shortest path from terminal ``u`` to terminal ``v`` as a list of
+        nodes.
+        """
+        pred = self.pred[self.index[u]]
+        source = self.graph_index[u]
+        k = self.graph_index[v]
+
+        path = [k]
+        while k != source:
+            k = int(pred[k])
+            path.append(k)
+        return [self.graph_nodes[k] for k in reversed(path)]
+
+    def spanning_tree(self):
+        """Minimum spanning tree of the closure, straight from ``distance``.
+
+        Dense Prim: each of the n - 1 steps takes the nearest terminal not
+        yet in the tree and updates the other terminals' distances from its
+        row. That is O(n^2) time, with only O(n) memory on top of the matrix.
+
+        Returns
+        -------
+        list
+            Tree edges as ``(u, v)`` terminal pairs.
+
+        """
+        n = len(self.nodes)
+        if n < 2:
+            return []
+
+        distance = self.distance
+        in_tree = numpy.zeros(n, dtype=bool)
+        in_tree[0] = True
+        best = distance[0].copy()  # distance from each terminal to the tree
+        best[0] = numpy.inf
+        parent = numpy.zeros(n, dtype=numpy.int64)
+
+        edges = []
+        for _ in range(n - 1):
+            j = int(numpy.argmin(best))
+            edges.append((self.nodes[parent[j]], self.nodes[j]))
+            in_tree[j] = True
+            best[j] = numpy.inf
+
+            closer = (distance[j] < best) & ~in_tree
+            best[closer] = distance[j][closer]
+            parent[closer] = j
+        return edges
+
+    def to_graph(self):
+        """Complete graph on the terminals with a ``distance`` edge attribute,
+        as returned by ``metric_closure``. This holds all n^2 pairs as
+        networkx edges, so ``steiner_tree`` uses ``spanning_tree`` instead.
+        """
+        M = nx.Graph(closure=self)
+        M.add_nodes_from(self.nodes)
+        n = len(self.nodes)
+        for i in range(n):
+            for j in range(i + 1, n):
+                M.add_edge(self.nodes[i], self.nodes[j], distance=self.distance[i, j])
+        return M
+
+
+# graph and terminals held by each pool worker, set once by _init_worker
+_worker_state = None
+
+
+def _init_worker(G, weight, terminals, graph_index, full):
+    global _worker_state
+    _worker_state = (G, weight, terminals, graph_index, full)
+
+
+def _dijkstra(G, source, targets, weight):
+    """Dijkstra from source that stops once every target is settled.
+
+    Returns dicts of final distances and of predecessors, for the nodes
+    settled before stopping.
+    """
+    G_succ = G.succ if G.is_directed() else G.adj
+    remaining = set(targets)
+
+    dist = {}
+    pred = {source: None}
+    seen = {source: 0}
+    c = count()
+    fringe = [(0, next(c), source)]
+
+    while fringe and remaining:
+        (d, _, v) = heappop(fringe)
+        if v in dist:
+            continue  # already searched this node.
+        dist[v] = d
+        remaining.discard(v)
+
+        for u, e in G_succ[v].items():
+            vu_dist = d + e.get(weight, 1)
+            if u not in dist and (u not in seen or vu_dist < seen[u]):
+                seen[u] = vu_dist
+                pred[u] = v
+                heappush(fringe, (vu_dist, next(c), u))
+
+    return dist, pred
+
+
+def _walk_back(pred, source, target):
+    path = [target]
+    while target != source:
+        target = pred[target]
+        path.append(target)
+    path.reverse()
+    return path
+
+
+def _closure_rows(sources, state=None):
+    """Distance rows and predecessor arrays for a shard of terminal indices.
+
+    With ``full`` set in the state, each search runs to completion and the
+    distance row covers every node of the graph (for caching), otherwise it
+    stops at and covers only the terminals.
+    """
+    G, weight, terminals, graph_index, full = state if state is not None else _worker_state
+
+    rows = []
+    for i in sources:
+        if full:
+            distance, pred = _dijkstra(G, terminals[i], graph_index, weight)
+            row = numpy.full(len(graph_index), numpy.inf)
+            for node, d in distance.items():
+                row[graph_index[node]] = d
+        else:
+            distance, pred = _dijkstra(G, terminals[i], terminals, weight)
+            if any(t not in distance for t in terminals):
+                msg = "G is not a connected graph. metric_closure is not defined."
+                raise nx.NetworkXError(msg)
+            row = numpy.array([distance[t] for t in terminals], dtype=numpy.float64)
+
+        pred_array = numpy.full(len(graph_index), -1, dtype=numpy.int32)
+        for node, previous in pred.items():
+            if previous is not None:
+                pred_array[graph_index[node]] = graph_index[previous]
+        rows.append((i, row, pred_array))
+    return rows
+
+
+def _run_shards(G, weight, terminals, graph_index, sources, workers, full=False):
+    """Run _closure_rows over sources, in-process or across a process pool.
+    """
+    state = (G, weight, terminals, graph_index, full)
+    if workers is None or workers <= 1:
+        return _closure_rows(sources, state)
+
+    chunks = numpy.array_split(numpy.asarray(sources, dtype=numpy.int64), workers * 4)
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=state
+    )
+    with executor:
+        shards = executor.map(_closure_rows, [c.tolist() for c in chunks if len(c)])
+        return list(chain.from_iterable(shards))
+
+
+def _cached_closure(G, terminals, weight, workers, cache):
+    """closure_matrix through a ClosureCache: map in cached source rows and
+    compute, then store, only the missing ones.
+    """
+    graph_nodes = list(G)
+    graph_index = {node: i for i, node in enumerate(graph_nodes)}
+    key = cache.fingerprint(G, weight)
+    cached = cache.rows(key)
+
+    missing = [i for i, t in enumerate(terminals) if graph_index[t] not in cached]
+    if missing:
+        rows = _run_shards(G, weight, terminals, graph_index, missing, workers, full=True)
+        cache.store(
+            key,
+            [graph_index[terminals[i]] for i, _, _ in rows],
+            numpy.stack([row for _, row, _ in rows]),
+            numpy.stack([pred_array for _, _, pred_array in rows])
+        )
+        cached = cache.rows(key)
+
+    columns = numpy.array([graph_index[t] for t in terminals], dtype=numpy.int64)
+    distance = numpy.empty((len(terminals), len(terminals)), dtype=numpy.float64)
+    pred = []
+    for i, t in enumerate(terminals):
+        row, pred_array = cached[graph_index[t]]
+        distance[i] = row[columns]
+        pred.append(pred_array)
+
+    if numpy.isinf(distance).any():
+        msg = "G is not a connected graph. metric_closure is not defined."
+        raise nx.NetworkXError(msg)
+
+    return MetricClosure(terminals, distance, graph_nodes, pred)
+
+
+def closure_matrix(G, terminals=None, weight='weight', workers=None, cache=None):
+    """Metric closure of a graph as a distance matrix.
+
+    Parameters
+    ----------
+    G : NetworkX graph
+
+    terminals : list, optional
+        Nodes to compute the closure between, by default all nodes of `G`.
+
+    weight : string, optional
+        Edge attribute holding edge lengths.
+
+    workers : int, optional
+        Number of worker processes for the Dijkstra runs. Runs in-process
+        when not given or 1.
+
+    cache : closure_cache.ClosureCache, optional
+        Reuse rows cached for this graph and cache any newly computed
+        ones. Cached searches run over the whole graph so their rows serve
+        any later terminal set.
+
+    Returns
+    -------
+    MetricClosure
+
+    """
+    terminals = list(G) if terminals is None else list(terminals)
+    if cache is not None:
+        return _cached_closure(G, terminals, weight, workers, cache)
+
+    n = len(terminals)
+    graph_nodes = list(G)
+    graph_index = {node: i for i, node in enumerate(graph_nodes)}
+
+    distance = numpy.empty((n, n), dtype=numpy.float64)
+    pred = [None] * n
+
+    for i, row, pred_array in _run_shards(G, weight, terminals, graph_index, range(n), workers):
+        distance[i] = row
+        pred[i] = pred_array
+
+    return MetricClosure(terminals, distance, graph_nodes, pred)
+
+
+def metric_closure(G, weight='weight', terminals=None, workers=None, cache=None):
+    """  Return the metric closure of a graph.
+
+    The metric closure of a graph *G* is the complete graph in which each edge
+    is weighted by the shortest path distance between the nodes in *G* .
+
+    Parameters
+    ----------
+    G : NetworkX graph
+
+    terminals : list, optional
+        Restrict the closure to these nodes, by default all nodes of `G`.
+
+    workers : int, optional
+        Number of worker processes to shard the Dijkstra runs across.
+
+    cache : closure_cache.ClosureCache, optional
+        On-disk cache of rows from earlier runs on the same graph.
+
+    Returns
+    -------
+    NetworkX graph
+        Metric closure of the graph `G`. Edges carry a ``distance``
+        attribute. Paths are rebuilt on demand with
+        ``M.graph['closure'].path(u, v)``.
+
+    """
+    closure = closure_matrix(G, terminals=terminals, weight=weight, workers=workers, cache=cache)
+    return closure.to_graph()
+
+
+def _voronoi(G, terminals, weight):
+    """Multi-source Dijkstra from all terminals at once.
+
+    Returns dicts of each node's distance to its nearest terminal, its
+    predecessor on the way there, and that terminal (its Voronoi region).
+    """
+    G_succ = G.succ if G.is_directed() else G.adj
+
+    dist = {}
+    pred = {}
+    region = {}
+    seen = {}
+    c = count()
+    fringe = []
+    for t in terminals:
+        seen[t] = 0
+        pred[t] = None
+        region[t] = t
+        heappush(fringe, (0, next(c), t))
+
+    while fringe:
+        (d, _, v) = heappop(fringe)
+        if v in dist:
+            continue  # already searched this node.
+        dist[v] = d
+
+        for u, e in G_succ[v].items():
+            vu_dist = d + e.get(weight, 1)
+            if u not in dist and (u not in seen or vu_dist < seen[u]):
+                seen[u] = vu_dist
+                pred[u] = v
+                region[u] = region[v]
+                heappush(fringe, (vu_dist, next(c), u))
+
+    return dist, pred, region
+
+
+def _mehlhorn_edges(G, terminals, weight):
+    """Edges of G making up Mehlhorn's approximate Steiner tree.
+    """
+    if len(terminals) < 2:
+        return []  # nothing to connect, as with 'kou'
+
+    dist, pred, region = _voronoi(G, terminals, weight)
+    order = {t: i for i, t in enumerate(terminals)}
+
+    # the terminal graph has one edge per pair of adjacent Voronoi regions,
+    # through their shortest boundary edge
+    bridges = {}
+    for u, v, e in G.edges(data=True):
+        if u not in region or v not in region:
+            continue
+        s, t = region[u], region[v]
+        if s == t:
+            continue
+        if order[s] > order[t]:
+            s, t, u, v = t, s, v, u
+        length = dist[u] + e.get(weight, 1) + dist[v]
+        if (s, t) not in bridges or length < bridges[s, t][0]:
+            bridges[s, t] = (length, u, v)
+
+    H = nx.Graph()
+    H.add_nodes_from(terminals)
+    for (s, t), (length, u, v) in bridges.items():
+        H.add_edge(s, t, distance=length, bridge=(u, v))
+    if not nx.is_connected(H):
+        msg = "G is not a connected graph. steiner_tree is not defined."
+        raise nx.NetworkXError(msg)
+
+    # expand each terminal graph MST edge back to terminal -> u -> v -> terminal
+    edges = []
+    for s, t, d in nx.minimum_spanning_edges(H, weight='distance', data=True):
+        u, v = d['bridge']
+        edges.extend(pairwise(_walk_back(pred, region[u], u)))
+        edges.append((u, v))
+        edges.extend(pairwise(_walk_back(pred, region[v], v)))
+
+    # the expanded paths may share nodes; keep a spanning tree of them and
+    # trim any leaves that are not terminals
+    T = nx.minimum_spanning_tree(G.edge_subgraph(edges), weight=weight)
+    terminal_set = set(terminals)
+    leaves = [n for n in T if T.degree(n) == 1 and n not in terminal_set]
+    while leaves:
+        leaf = leaves.pop()
+        neighbours = list(T[leaf])
+        T.remove_node(leaf)
+        for n in neighbours:
+            if T.degree(n) == 1 and n not in terminal_set:
+                leaves.append(n)
+
+    return T.edges
+
+
+def steiner_tree(G, terminal_nodes, weight='weight', workers=None, method='kou', cache=None):
+    """ Return an approximation to the minimum Steiner tree of a graph.
+
+    Parameters
+    ----------
+    G : NetworkX graph
+
+    terminal_nodes : list
+         A list of terminal nodes for which minimum steiner tree is
+         to be found.
+
+    workers : int, optional
+         Number of worker processes for the metric closure.
+
+    method : string, optional
+         ``'kou'`` (default) uses the metric closure between the terminals,
+         one Dijkstra per terminal. ``'mehlhorn'`` uses a single
+         multi-source Dijkstra from all terminals instead.
+
+    cache : closure_cache.ClosureCache, optional
+         On-disk cache for the metric closure, used by ``'kou'``.
+
+    Returns
+    -------
+    NetworkX graph
+        Approximation to the minimum steiner tree of `G` induced by
+        `terminal_nodes` .
+
+    Notes
+    -----
+    Steiner tree can be approximated by computing the minimum spanning
+    tree of the subgraph of the metric closure of the graph induced by the
+    terminal nodes, where the metric closure of *G* is the complete graph in
+    which each edge is weighted by the shortest path distance between the
+    nodes in *G* .
+    This algorithm produces a tree whose weight is within a (2 - (2 / t))
+    factor of the weight of the optimal Steiner tree where *t* is number of
+    terminal nodes.
+
+    Mehlhorn's variant replaces the metric closure with the graph of
+    adjacent Voronoi regions around the terminals, weighted by the shortest
+    path through their boundary edges. Its MST gives the same (2 - (2 / t))
+    bound in O(E log V) total rather than O(t E log V).
+
+    """
+    if method == 'mehlhorn':
+        terminal_nodes = set(terminal_nodes)
+        terminals = [node for node in G if node in terminal_nodes]
+        return G.edge_subgraph(_mehlhorn_edges(G, terminals, weight))
+    if method != 'kou':
+        raise ValueError("method must be 'kou' or 'mehlhorn', not {!r}".format(method))
+
+    # the metric closure of G restricted to the terminal nodes, built from
+    # Dijkstra runs over the terminals only, and its MST taken straight from
+    # the distance matrix without building the complete graph
+    terminal_nodes = set(terminal_nodes)
+    terminals = [node for node in G if node in terminal_nodes]
+    closure = closure_matrix(G, terminals=terminals, weight=weight, workers=workers, cache=cache)
+    mst_edges = closure.spanning_tree()
+    # Create an iterator over each edge in each shortest path, rebuilt from
+    # the closure's predecessor arrays for MST edges only; repeats are okay
+    edges = chain.from_iterable(pairwise(closure.path(u, v)) for u, v in mst_edges)
+    T = G.edge_subgraph(edges)
+    return T
@@ -0,0 +1,49 @@
+import random
+
+import networkx
+import pytest
+
+from contraction_hierarchy import build_hierarchy, load_hierarchy
+from single_source_with_roads import _dijkstra_tree
+
+
+def tree_distances(G, tree, source):
+    return networkx.single_source_dijkstra_path_length(
+        tree, source, weight=lambda u, v, e: G.edges[u, v]['length'])
+
+
+@pytest.mark.parametrize('unit', [True, False])
+def test_trees_match_dijkstra(unit):
+    # unit lengths give many equal-length paths
+    rng = random.Random(0)
+    G = networkx.convert_node_labels_to_integers(networkx.grid_2d_graph(12, 12))
+    for u, v in G.edges:
+        G.edges[u, v]['length'] = 1 if unit else rng.uniform(0.01, 0.1)
+    hierarchy = build_hierarchy(G)
+
+    for _ in range(100):
+        source = rng.choice(list(G))
+        sinks = rng.sample([node for node in G if node != source], 4)
+        tree = hierarchy.shortest_path_tree(source, sinks)
+        expected = _dijkstra_tree(G, source, sinks)
+
+        assert networkx.is_tree(tree)
+        assert set(sinks) <= set(tree)
+        assert all(G.has_edge(u, v) for u, v in tree.edges)
+        got = tree_distances(G, tree, source)
+        want = tree_distances(G, expected, source)
+        assert all(got[sink] == pytest.approx(want[sink]) for sink in sinks)
+        if not unit:
+            assert {frozenset(e) for e in tree.edges} == {frozenset(e) for e in expected.edges}
+
+
+def test_save_and_load(tmp_path):
+    G = networkx.path_graph(5)
+    for u, v in G.edges:
+        G.edges[u, v]['length'] = 1.5
+    path = str(tmp_path / 'hierarchy.pkl')
+    build_hierarchy(G).save(path)
+
+    distance, nodes = load_hierarchy(path).one_to_many(0, [4])[4]
+    assert distance == 6.0
+    assert nodes == [0, 1, 2, 3, 4]
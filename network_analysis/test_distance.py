@@ -0,0 +1,60 @@
+import numpy
+import pytest
+
+geopy_distance = pytest.importorskip('geopy.distance')
+
+from distance import ELLIPSOIDS, distances
+
+# geopy takes (lat, lon); these pairs are (lon, lat) as GeoJSON
+PAIRS = [
+    ((0.12996, 52.220977), (0.130269, 52.221033)),   # a few metres
+    ((-0.1276, 51.5072), (-2.2426, 53.4808)),        # London - Manchester
+    ((-74.006, 40.7128), (151.2093, -33.8688)),      # New York - Sydney
+    ((0.0, 0.0), (0.0, 0.0)),                        # same point
+    ((0.0, 90.0), (0.0, -90.0)),                     # pole to pole
+    ((0.0, 0.0), (179.5, 0.5)),                      # near-antipodal
+    ((0.0, 0.0), (179.7, 0.0)),                      # near-antipodal, on the equator
+    ((0.0, 0.0), (180.0, 0.0)),                      # antipodal, on the equator
+    ((10.0, 30.0), (-170.0, -30.0)),                 # antipodal
+]
+
+
+def test_vincenty_matches_geopy_geodesic():
+    a, b = map(numpy.array, zip(*PAIRS))
+    expected = [geopy_distance.geodesic(p[::-1], q[::-1]).km for p, q in PAIRS]
+
+    result = distances(a, b, method='vincenty')
+
+    # within a millimetre, including where geographiclib takes over
+    numpy.testing.assert_allclose(result, expected, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize('ellipsoid', sorted(ELLIPSOIDS))
+def test_vincenty_ellipsoids_match_geopy(ellipsoid):
+    rng = numpy.random.default_rng(0)
+    a = numpy.column_stack((rng.uniform(-180, 180, 200), rng.uniform(-90, 90, 200)))
+    b = numpy.column_stack((rng.uniform(-180, 180, 200), rng.uniform(-90, 90, 200)))
+    expected = [
+        geopy_distance.geodesic(p[::-1], q[::-1], ellipsoid=ellipsoid).km
+        for p, q in zip(a.tolist(), b.tolist())
+    ]
+
+    result = distances(a, b, method='vincenty', ellipsoid=ellipsoid)
+
+    numpy.testing.assert_allclose(result, expected, rtol=0, atol=1e-6)
+
+
+def test_haversine_matches_geopy_great_circle():
+    a, b = map(numpy.array, zip(*PAIRS))
+    expected = [geopy_distance.great_circle(p[::-1], q[::-1]).km for p, q in PAIRS]
+
+    result = distances(a, b, method='haversine')
+
+    # geopy's radius is 6371.009 km against EARTH_RADIUS_KM's 6371.0088, so
+    # allow that ratio (3e-8) plus rounding: under a metre at antipodes
+    numpy.testing.assert_allclose(result, expected, rtol=1e-7, atol=1e-9)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        distances([(0, 0)], [(1, 1)], method='flat')
@@ -0,0 +1,62 @@
+import numpy
+import pytest
+
+from dynamic_mst import DynamicMST
+from euclidean_mst import euclidean_mst_from_coords
+
+
+def rebuilt_weight(dynamic):
+    ids = list(dynamic._ids)
+    return sum(w for _, _, w in euclidean_mst_from_coords(ids, dynamic._xy[:len(ids)]))
+
+
+def assert_spanning_tree(dynamic):
+    edges = dynamic.edges()
+    assert len(edges) == max(len(dynamic) - 1, 0)
+    assert dynamic.total_weight() == pytest.approx(rebuilt_weight(dynamic), abs=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('max_cone_searches', [0, 64])
+def test_random_updates_match_rebuild(seed, max_cone_searches):
+    # points on a coarse grid, so many share a location
+    rng = numpy.random.default_rng(seed)
+    n = 150
+    coords = rng.integers(0, 40, (n, 2)) / 1000.0
+    dynamic = DynamicMST(range(n), coords)
+    dynamic.max_cone_searches = max_cone_searches
+    assert_spanning_tree(dynamic)
+
+    next_id = n
+    for _ in range(300):
+        if rng.random() < 0.5 and len(dynamic) > 2:
+            dynamic.delete(dynamic._ids[rng.integers(len(dynamic))])
+        else:
+            dynamic.insert(next_id, rng.integers(0, 40, 2) / 1000.0)
+            next_id += 1
+        assert_spanning_tree(dynamic)
+
+
+def test_delete_rejoins_coincident_points():
+    # 1 and 2 share a location and reach 3, 4, 5 only through 0. After 0
+    # goes, each of 1 and 2 sits in the cone of the other that holds 3
+    dynamic = DynamicMST(
+        [0, 1, 2, 3, 4, 5],
+        [(0.005, 0.0005), (0.0, 0.0), (0.0, 0.0), (0.01, 0.001), (0.011, 0.001), (0.012, 0.001)]
+    )
+    assert dynamic.tree.has_link(0, 3)
+
+    added, _ = dynamic.delete(0)
+
+    assert [(a, b) for a, b, _ in added] in ([(1, 3)], [(2, 3)])
+    assert_spanning_tree(dynamic)
+
+
+def test_insert_returns_net_changes():
+    dynamic = DynamicMST([0, 1], [(0.0, 0.0), (1.0, 0.0)])
+    added, removed = dynamic.insert(2, (0.5, 0.0))
+
+    assert sorted(added) == [(2, 0, 0.5), (2, 1, 0.5)]
+    assert removed == [(0, 1, 1.0)]
+    with pytest.raises(ValueError):
+        dynamic.insert(2, (0.0, 1.0))
@@ -0,0 +1,110 @@
+import random
+
+import networkx
+import pytest
+
+from dynamic_sssp import DynamicShortestPaths
+
+
+def grid(side=8, seed=0, integer=False):
+    rng = random.Random(seed)
+    G = networkx.convert_node_labels_to_integers(networkx.grid_2d_graph(side, side))
+    for u, v in G.edges:
+        # small integer lengths give many equal-length paths
+        G.edges[u, v]['length'] = rng.randint(1, 3) if integer else rng.uniform(0.01, 0.1)
+    return G
+
+
+def snapshot(dynamic):
+    return {
+        source: {sink: dynamic.states[source].path(sink)
+                 for sink in sinks if sink in dynamic.states[source].dist}
+        for source, sinks in dynamic.sinks.items()
+    }
+
+
+def check(dynamic, before, changed):
+    """Distances, predecessors, trees and changed sinks after an edit."""
+    G = dynamic.G
+    after = snapshot(dynamic)
+    for source, sinks in dynamic.sinks.items():
+        state = dynamic.states[source]
+        expected = networkx.single_source_dijkstra_path_length(G, source, weight='length')
+
+        assert set(state.dist) == set(expected)
+        for node, d in expected.items():
+            assert state.dist[node] == pytest.approx(d)
+            parent = state.pred[node]
+            if node == source:
+                assert parent is None
+            else:
+                assert state.dist[node] == pytest.approx(state.dist[parent] + G.edges[parent, node]['length'])
+                assert node in state.children[parent]
+
+        moved = {sink for sink in sinks if before[source].get(sink) != after[source].get(sink)}
+        assert moved <= set(changed[source])
+
+        if all(sink in expected for sink in sinks):
+            tree = dynamic.tree(source)
+            assert networkx.is_tree(tree)
+            assert set(sinks) <= set(tree)
+            assert all(data['row'] == G.edges[u, v]['row'] for u, v, data in tree.edges(data=True))
+
+
+@pytest.mark.parametrize('integer', [False, True])
+def test_random_edits(integer):
+    G = grid(integer=integer)
+    for row, (u, v) in enumerate(G.edges):
+        G.edges[u, v]['row'] = row
+    rng = random.Random(1)
+    nodes = list(G)
+    sources_sinks = {source: rng.sample(nodes, 10) for source in rng.sample(nodes, 4)}
+    dynamic = DynamicShortestPaths(G, sources_sinks)
+    next_row = G.number_of_edges()
+
+    for _ in range(300):
+        u, v = rng.choice(list(G.edges)) if rng.random() < 0.6 else rng.sample(nodes, 2)
+        before = snapshot(dynamic)
+        if not G.has_edge(u, v):
+            length = rng.randint(1, 6) if integer else rng.uniform(0.01, 0.5)
+            changed = dynamic.add_edge(u, v, length, row=next_row)
+            next_row += 1
+        elif rng.random() < 0.5:
+            changed = dynamic.remove_edge(u, v)
+        else:
+            old = G.edges[u, v]['length']
+            length = rng.choice([old - 1, old + 1, old]) if integer else old * rng.uniform(0.5, 2)
+            changed = dynamic.set_length(u, v, max(length, 1) if integer else length)
+        check(dynamic, before, changed)
+
+
+def test_add_shortcut_reports_changed_sinks():
+    G = networkx.path_graph(5)
+    networkx.set_edge_attributes(G, 1.0, 'length')
+    dynamic = DynamicShortestPaths(G, {0: [3, 4]})
+
+    assert dynamic.add_edge(0, 3, 1.5) == {0: [3, 4]}
+    assert dynamic.states[0].dist[4] == 2.5
+    assert dynamic.set_length(0, 3, 1.5) == {0: []}
+    assert dynamic.set_length(0, 3, 5.0) == {0: [3, 4]}
+    assert dynamic.states[0].path(4) == [0, 1, 2, 3, 4]
+
+
+def test_sink_becomes_unreachable_and_returns():
+    G = networkx.path_graph(4)
+    networkx.set_edge_attributes(G, 1.0, 'length')
+    dynamic = DynamicShortestPaths(G, {0: [1, 3]})
+
+    assert dynamic.remove_edge(1, 2) == {0: [3]}
+    assert 3 not in dynamic.states[0].dist
+    with pytest.raises(networkx.NetworkXNoPath):
+        dynamic.tree(0)
+
+    assert dynamic.add_edge(0, 2, 4.0) == {0: [3]}
+    assert dynamic.states[0].dist[3] == 5.0
+    assert {frozenset(e) for e in dynamic.tree(0).edges} == {frozenset(e) for e in [(0, 1), (0, 2), (2, 3)]}
+
+
+def test_directed_graph_rejected():
+    with pytest.raises(ValueError):
+        DynamicShortestPaths(networkx.DiGraph([(0, 1)]), {0: [1]})
@@ -0,0 +1,14 @@
+import pytest
+
+from euclidean_mst import euclidean_mst_from_coords
+
+
+@pytest.mark.parametrize('geodesic', [False, True])
+def test_small_layers(geodesic):
+    assert euclidean_mst_from_coords([], [], geodesic=geodesic) == []
+    assert euclidean_mst_from_coords(['dp'], [(0.13, 52.22)], geodesic=geodesic) == []
+
+    # collinear points cannot be triangulated
+    tree = euclidean_mst_from_coords(
+        ['a', 'b', 'c'], [(0.10, 52.0), (0.11, 52.0), (0.12, 52.0)], geodesic=geodesic)
+    assert sorted((u, v) for u, v, _ in tree) == [('a', 'b'), ('b', 'c')]
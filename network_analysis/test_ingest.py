@@ -0,0 +1,73 @@
+import json
+import sqlite3
+import struct
+import sys
+
+import numpy
+import pytest
+
+from ingest import _write_test_files, load_points, read_points
+
+FEATURES = [
+    {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [0.1, 52.2]},
+     'properties': {'name': 'premises_1', 'link': 'dp_1'}},
+    {'type': 'Feature', 'geometry': None,
+     'properties': {'name': 'premises_2', 'link': 'dp_1'}},
+    {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [0.3, 52.4, 10.0]},
+     'properties': {'name': 'premises_3'}},
+]
+
+
+def check_features(coords, values):
+    numpy.testing.assert_array_equal(coords, [[0.1, 52.2], [numpy.nan, numpy.nan], [0.3, 52.4]])
+    assert values['name'].tolist() == ['premises_1', 'premises_2', 'premises_3']
+    assert values['link'].tolist() == ['dp_1', 'dp_1', None]
+
+
+def test_ndjson_with_null_geometry(tmp_path):
+    path = tmp_path / 'points.geojsonl'
+    path.write_text('\n'.join(json.dumps(feature) for feature in FEATURES) + '\n')
+    check_features(*load_points(str(path), ('name', 'link')))
+
+
+def test_ndjson_without_ijson(tmp_path, monkeypatch):
+    path = tmp_path / 'points.geojsonl'
+    path.write_text('\n'.join(json.dumps(feature) for feature in FEATURES) + '\n')
+    monkeypatch.setitem(sys.modules, 'ijson', None)  # import fails
+    check_features(*load_points(str(path), ('name', 'link')))
+
+
+def test_feature_collection(tmp_path):
+    pytest.importorskip('ijson')
+    path = tmp_path / 'points.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': FEATURES}))
+    check_features(*load_points(str(path), ('name', 'link')))
+
+
+def test_geopackage_with_null_geometry_and_missing_column(tmp_path):
+    path = str(tmp_path / 'points.gpkg')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE gpkg_geometry_columns (table_name TEXT, column_name TEXT)')
+    connection.execute("INSERT INTO gpkg_geometry_columns VALUES ('points', 'geom')")
+    connection.execute('CREATE TABLE points (fid INTEGER PRIMARY KEY, geom BLOB, name TEXT)')
+    point = b'GP\x00\x01' + struct.pack('<i', 4326) + struct.pack('<BIdd', 1, 1, 0.1, 52.2)
+    connection.executemany('INSERT INTO points (geom, name) VALUES (?, ?)',
+                           [(point, 'premises_1'), (None, 'premises_2')])
+    connection.commit()
+    connection.close()
+
+    coords, values = load_points(path, ('name', 'link'))
+
+    numpy.testing.assert_array_equal(coords, [[0.1, 52.2], [numpy.nan, numpy.nan]])
+    assert values['name'].tolist() == ['premises_1', 'premises_2']
+    assert values['link'].tolist() == [None, None]
+
+
+def test_chunks_cover_every_format(tmp_path):
+    pytest.importorskip('ijson')
+    coords, paths = _write_test_files(str(tmp_path), 250)
+    for path in paths:
+        chunks = [(chunk.copy(), values['id'].copy()) for chunk, values in read_points(path, ('id',), 100)]
+        assert [len(chunk) for chunk, _ in chunks] == [100, 100, 50]
+        numpy.testing.assert_array_equal(numpy.concatenate([c for c, _ in chunks]), coords)
+        assert numpy.concatenate([ids for _, ids in chunks]).tolist() == list(range(250))
@@ -0,0 +1,95 @@
+import numpy
+import pytest
+
+import min_span_tree2
+from kruskal import DisjointSet, KruskalStats, kruskal
+
+
+def test_find_halves_the_path():
+    # a hand-built chain 5 -> 4 -> 3 -> 2 -> 1 -> 0
+    components = DisjointSet(6)
+    components.parent = [0, 0, 1, 2, 3, 4]
+
+    assert components.find(5) == 0
+    # every node on the path now points at its old grandparent
+    assert components.parent == [0, 0, 1, 1, 3, 3]
+    assert components.find(5) == 0
+    assert components.parent[5] == 1
+
+
+def test_union_attaches_lower_rank_root():
+    components = DisjointSet(4)
+    assert components.union(0, 1)
+    root = components.find(0)
+    assert components.rank[root] == 1
+
+    # a singleton goes under the rank-1 root, whichever side it is on
+    assert components.union(2, 0)
+    assert components.find(2) == root
+    assert components.rank[root] == 1
+    assert components.union(root, 3)
+    assert components.find(3) == root
+
+    assert not components.union(1, 2)
+
+
+def test_union_over_hashable_items():
+    components = DisjointSet(['a', 'b', 'c'])
+    assert components.union('a', 'b')
+    assert not components.union('b', 'a')
+    assert components.find('a') == components.find('b') != components.find('c')
+
+
+@pytest.mark.parametrize('n', [10**3, 10**4, 10**5])
+@pytest.mark.parametrize('reverse', [False, True])
+def test_chain_finds_stay_shallow(n, reverse):
+    # each edge joins a new singleton to the tree built so far, the order
+    # that makes an uncompressed, rank-blind union-find quadratic
+    u = numpy.arange(1, n + 1)
+    v = numpy.arange(0, n)
+    if reverse:
+        u, v = v, u
+    stats = KruskalStats()
+
+    mst = kruskal(u, v, numpy.arange(n, dtype=numpy.float64), n + 1, stats=stats)
+
+    assert len(mst) == n
+    assert stats.max_find_depth <= 1
+    assert stats.find_steps <= n
+
+
+def test_kruskal_stops_at_tree_size():
+    # a 4-vertex tree from the lightest edges, then edges never needed
+    u = [0, 1, 2, 0, 1, 0]
+    v = [1, 2, 3, 2, 3, 3]
+    w = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    stats = KruskalStats()
+
+    mst = kruskal(u, v, w, 4, stats=stats)
+
+    assert mst.tolist() == [0, 1, 2]
+    assert stats.edges_scanned == 3
+
+
+def test_spanning_tree_stops_at_tree_size(monkeypatch):
+    calls = []
+
+    class CountingDisjointSet(DisjointSet):
+        def union(self, a, b):
+            calls.append((a, b))
+            return DisjointSet.union(self, a, b)
+
+    monkeypatch.setattr(min_span_tree2, 'DisjointSet', CountingDisjointSet)
+
+    G = min_span_tree2.Graph()
+    G.add('a', 'b', 1)
+    G.add('b', 'c', 2)
+    G.add('c', 'd', 3)
+    G.add('a', 'c', 4)
+    G.add('b', 'd', 5)
+    G.add('a', 'd', 6)
+
+    mst = G.spanning_tree()
+
+    assert sorted(mst.edges()) == [('a', 'b', 1), ('b', 'c', 2), ('c', 'd', 3)]
+    assert len(calls) == 3
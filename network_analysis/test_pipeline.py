@@ -0,0 +1,63 @@
+import json
+import logging
+
+import numpy
+
+from pipeline import run
+
+
+def write_layer(path, features):
+    with open(path, 'w') as f:
+        for name, xy, link in features:
+            geometry = None if xy is None else {'type': 'Point', 'coordinates': xy}
+            f.write(json.dumps({'type': 'Feature', 'geometry': geometry,
+                                'properties': {'name': name, 'link': link}}) + '\n')
+
+
+def write_layers(directory, n_cabinets=4, dps_per_cabinet=3, premises_per_dp=5, seed=0):
+    rng = numpy.random.default_rng(seed)
+    cabinets, dps, premises = [], [], []
+    for c in range(n_cabinets):
+        centre = [0.1 + c * 0.05, 52.2]
+        cabinets.append(('cab_{}'.format(c), centre, None))
+        for d in range(dps_per_cabinet):
+            dp = 'dp_{}_{}'.format(c, d)
+            dps.append((dp, (centre + rng.normal(0, 0.005, 2)).tolist(), 'cab_{}'.format(c)))
+            for p in range(premises_per_dp):
+                premises.append(('{}_p{}'.format(dp, p), (centre + rng.normal(0, 0.005, 2)).tolist(), dp))
+    # a distribution point with no premises, and features with no geometry
+    dps.append(('dp_empty', [0.1, 52.21], 'cab_0'))
+    dps.append(('dp_nowhere', None, 'cab_0'))
+    premises.append(('p_nowhere', None, 'dp_0_0'))
+
+    paths = [str(directory / name) for name in ('premises.geojsonl', 'dps.geojsonl', 'cabinets.geojsonl')]
+    for path, layer in zip(paths, (premises, dps, cabinets)):
+        write_layer(path, layer)
+    return paths
+
+
+def read_results(path):
+    with open(path) as f:
+        return sorted((json.loads(line) for line in f), key=lambda result: result['cabinet'])
+
+
+def test_serial_and_pooled_runs_agree(tmp_path, caplog):
+    paths = write_layers(tmp_path)
+    serial_path = str(tmp_path / 'serial.ndjson')
+    pooled_path = str(tmp_path / 'pooled.ndjson')
+
+    with caplog.at_level(logging.WARNING, logger='pipeline'):
+        assert run(*paths, serial_path) == 4
+    assert 'dropping 1 premises' in caplog.text
+    assert 'dropping 1 distribution points' in caplog.text
+    assert run(*paths, pooled_path, workers=2) == 4
+
+    serial = read_results(serial_path)
+    assert serial == read_results(pooled_path)
+
+    first = serial[0]
+    assert first['cabinet'] == 'cab_0'
+    assert first['premises']['dp_empty'] == []
+    assert all(len(tree) == 5 for name, tree in first['premises'].items() if name != 'dp_empty')
+    assert len(first['distribution_points']) == 4
+    assert 'dp_nowhere' not in first['premises']
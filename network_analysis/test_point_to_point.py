@@ -0,0 +1,54 @@
+import random
+
+import networkx
+import numpy
+import pytest
+
+from distance import distances
+from point_to_point import METHODS
+
+
+@pytest.fixture(scope='module')
+def road_graph():
+    """Jittered lon/lat grid around Cambridge, edges a little longer than
+    their ellipsoidal length, as roads are."""
+    rng = numpy.random.default_rng(0)
+    G = networkx.grid_2d_graph(15, 15)
+    for (i, j), jitter in zip(list(G), rng.normal(0, 0.00003, (len(G), 2))):
+        G.nodes[i, j]['pos'] = (0.1 + i * 0.0003 + jitter[0], 52.2 + j * 0.0002 + jitter[1])
+    edges = list(G.edges)
+    a = numpy.array([G.nodes[u]['pos'] for u, _ in edges])
+    b = numpy.array([G.nodes[v]['pos'] for _, v in edges])
+    lengths = distances(a, b) * rng.uniform(1, 1.2, len(edges))
+    for (u, v), length in zip(edges, lengths.tolist()):
+        G.edges[u, v]['length'] = length
+    return G
+
+
+@pytest.mark.parametrize('method', sorted(METHODS))
+def test_lengths_match_dijkstra(road_graph, method):
+    G = road_graph
+    rng = random.Random(0)
+    nodes = list(G)
+
+    for _ in range(50):
+        source, target = rng.sample(nodes, 2)
+        length, path, settled = METHODS[method](G, source, target)
+
+        assert length == pytest.approx(
+            networkx.dijkstra_path_length(G, source, target, weight='length'), abs=1e-12)
+        assert path[0] == source and path[-1] == target
+        assert sum(G.edges[u, v]['length'] for u, v in zip(path, path[1:])) == pytest.approx(length)
+        assert 0 < settled <= len(G)
+
+
+@pytest.mark.parametrize('method', sorted(METHODS))
+def test_same_node_and_no_path(road_graph, method):
+    G = road_graph.copy()
+    length, path, _ = METHODS[method](G, (0, 0), (0, 0))
+    assert length == 0
+    assert path == [(0, 0)]
+
+    G.add_node('island', pos=(0.2, 52.3))
+    with pytest.raises(networkx.NetworkXNoPath):
+        METHODS[method](G, (0, 0), 'island')
@@ -0,0 +1,66 @@
+import random
+
+import networkx
+import pytest
+
+from csr_graph import compile_graph
+from single_source_with_roads import shortest_path_tree, shortest_path_trees
+
+
+def road_graph(side=12, seed=0):
+    """Grid of random lengths, plus a separate two-node piece of road."""
+    rng = random.Random(seed)
+    G = networkx.grid_2d_graph(side, side)
+    G = networkx.convert_node_labels_to_integers(G)
+    for u, v in G.edges:
+        G.edges[u, v]['length'] = rng.uniform(0.01, 0.1)
+    island = (G.number_of_nodes(), G.number_of_nodes() + 1)
+    G.add_edge(*island, length=0.05)
+    return G, island
+
+
+@pytest.mark.parametrize('engine', ['python', 'scipy'])
+def test_compiled_tree_matches_dict_tree(engine):
+    G, _ = road_graph()
+    compiled = compile_graph(G, weight='length')
+    sinks = [5, 40, 77, 143]
+
+    expected = shortest_path_tree(G, 0, sinks)
+    tree = shortest_path_tree(G, 0, sinks, compiled=compiled, engine=engine)
+
+    assert set(tree.nodes) == set(expected.nodes)
+    assert {frozenset(e) for e in tree.edges} == {frozenset(e) for e in expected.edges}
+
+
+@pytest.mark.parametrize('engine', ['python', 'scipy'])
+def test_unreachable_sink_raises(engine):
+    G, island = road_graph()
+    compiled = compile_graph(G, weight='length')
+
+    with pytest.raises(networkx.NetworkXNoPath):
+        shortest_path_tree(G, 0, [5, island[0]])
+    # the island's last node is also the last compiled node
+    for sink in island:
+        with pytest.raises(networkx.NetworkXNoPath):
+            shortest_path_tree(G, 0, [5, sink], compiled=compiled, engine=engine)
+
+
+def test_pool_passes_unreachable_sink_error_back():
+    G, island = road_graph()
+    sources_sinks = {0: [5, island[1]], 1: [40], 2: [77]}
+
+    with pytest.raises(networkx.NetworkXNoPath):
+        list(shortest_path_trees(G, sources_sinks))
+    with pytest.raises(networkx.NetworkXNoPath):
+        list(shortest_path_trees(G, sources_sinks, workers=2))
+
+
+@pytest.mark.parametrize('method', ['astar', 'bidirectional'])
+def test_point_to_point_method_rejects_compiled(method):
+    G, _ = road_graph()
+    compiled = compile_graph(G, weight='length')
+
+    with pytest.raises(ValueError):
+        shortest_path_tree(G, 0, [77], compiled=compiled, method=method)
+    with pytest.raises(ValueError):
+        shortest_path_tree(G, 0, [77], hierarchy=object(), method=method)
@@ -0,0 +1,66 @@
+import geopandas
+import shapely
+import snkit
+from shapely.geometry import LineString, Point
+
+from snap import link_nodes_to_nearest_edge, split_edges_at_nodes
+
+
+def hand_built_network():
+    nodes = geopandas.GeoDataFrame({'name': ['a', 'b', 'c', 'd', 'e', 'f']}, geometry=[
+        Point(0, 0), Point(4, 0), Point(7, 0), Point(10, 0), Point(10, 5), Point(10, 10)])
+    edges = geopandas.GeoDataFrame({'road': ['x', 'y']}, geometry=[
+        LineString([(0, 0), (5, 0), (10, 0)]),
+        LineString([(10, 0), (10, 10)]),
+    ])
+    return snkit.Network(nodes=nodes, edges=edges)
+
+
+def with_topology(network):
+    network = snkit.network.add_ids(network)
+    return snkit.network.add_topology(network)
+
+
+def test_split_edges_at_nodes_ids():
+    network = with_topology(split_edges_at_nodes(hand_built_network()))
+    edges = network.edges
+
+    assert edges['id'].tolist() == ['edge_0', 'edge_1', 'edge_2', 'edge_3', 'edge_4']
+    assert edges['road'].tolist() == ['x', 'x', 'x', 'y', 'y']
+    assert list(zip(edges.from_id, edges.to_id)) == [
+        ('node_0', 'node_1'),
+        ('node_1', 'node_2'),
+        ('node_2', 'node_3'),
+        ('node_3', 'node_4'),
+        ('node_4', 'node_5'),
+    ]
+    # the existing vertex at (5, 0) stays in its piece
+    assert [list(g.coords) for g in edges.geometry] == [
+        [(0, 0), (4, 0)],
+        [(4, 0), (5, 0), (7, 0)],
+        [(7, 0), (10, 0)],
+        [(10, 0), (10, 5)],
+        [(10, 5), (10, 10)],
+    ]
+
+
+def test_split_edges_at_nodes_matches_snkit():
+    ours = split_edges_at_nodes(hand_built_network())
+    theirs = snkit.network.split_edges_at_nodes(hand_built_network())
+
+    assert ours.edges.drop(columns='geometry').equals(theirs.edges.drop(columns='geometry'))
+    assert all(shapely.equals_exact(ours.edges.geometry.values, theirs.edges.geometry.values, 1e-9))
+
+
+def test_link_nodes_to_nearest_edge():
+    network = hand_built_network()
+    network.nodes = geopandas.GeoDataFrame(
+        {'name': ['premises']}, geometry=[Point(2, 3)])
+
+    linked = with_topology(link_nodes_to_nearest_edge(network))
+
+    # the premises, and a new node where it meets road x
+    assert [(p.x, p.y) for p in linked.nodes.geometry] == [(2, 3), (2, 0)]
+    link = linked.edges[linked.edges.geometry.apply(lambda g: g.equals(LineString([(2, 3), (2, 0)])))]
+    assert list(zip(link.from_id, link.to_id)) == [('node_0', 'node_1')]
+    assert sorted(len(g.coords) for g in linked.edges.geometry[linked.edges.road == 'x']) == [2, 3]
@@ -0,0 +1,193 @@
+import os
+from itertools import chain
+
+import networkx as nx
+import numpy
+import pytest
+from networkx.utils import pairwise
+
+from closure_cache import ClosureCache
+from steiner import _dijkstra, closure_matrix, metric_closure, steiner_tree
+
+
+def random_graph(n=60, seed=0):
+    """Connected random geometric graph with distinct float weights."""
+    G = nx.random_geometric_graph(n, 0.3, seed=seed)
+    rng = numpy.random.default_rng(seed)
+    for u, v in G.edges:
+        G.edges[u, v]['weight'] = float(rng.uniform(1, 2))
+    return G.subgraph(max(nx.connected_components(G), key=len)).copy()
+
+
+def baseline_kou(G, terminals, weight='weight'):
+    """steiner_tree as it was before steiner.py: the all-pairs metric
+    closure with stored paths, and networkx's MST of it."""
+    M = nx.Graph()
+    for u, (distance, path) in nx.all_pairs_dijkstra(G, weight=weight):
+        for v in distance:
+            if u != v:
+                M.add_edge(u, v, distance=distance[v], path=path[v])
+    H = M.subgraph(terminals)
+    mst_edges = nx.minimum_spanning_edges(H, weight='distance', data=True)
+    edges = chain.from_iterable(pairwise(d['path']) for u, v, d in mst_edges)
+    return G.edge_subgraph(edges)
+
+
+def edge_set(T):
+    return {frozenset(e) for e in T.edges}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_kou_matches_baseline(seed):
+    G = random_graph(seed=seed)
+    rng = numpy.random.default_rng(seed)
+    terminals = rng.choice(list(G), 10, replace=False).tolist()
+
+    assert edge_set(steiner_tree(G, terminals)) == edge_set(baseline_kou(G, terminals))
+
+
+def test_closure_paths_match_dijkstra():
+    G = random_graph()
+    terminals = list(G)[::5]
+    closure = closure_matrix(G, terminals=terminals)
+
+    assert all(p.dtype == numpy.int32 for p in closure.pred)
+    for u in terminals:
+        distance, path = nx.single_source_dijkstra(G, u)
+        for v in terminals:
+            assert closure.distance[closure.index[u], closure.index[v]] == pytest.approx(distance[v])
+            assert closure.path(u, v) == path[v]
+
+
+def test_spanning_tree_matches_networkx():
+    G = random_graph()
+    terminals = list(G)[::3]
+    closure = closure_matrix(G, terminals=terminals)
+    M = metric_closure(G, terminals=terminals)
+
+    expected = edge_set(nx.minimum_spanning_tree(M, weight='distance'))
+    assert {frozenset(e) for e in closure.spanning_tree()} == expected
+
+
+
+@pytest.mark.parametrize('method', ['kou', 'mehlhorn'])
+def test_too_few_terminals(method):
+    G = random_graph()
+    assert steiner_tree(G, [], method=method).number_of_edges() == 0
+    assert steiner_tree(G, [next(iter(G))], method=method).number_of_edges() == 0
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_mehlhorn_spans_terminals_within_twice_kou(seed):
+    G = random_graph(seed=seed)
+    rng = numpy.random.default_rng(seed)
+    terminals = rng.choice(list(G), 10, replace=False).tolist()
+
+    T = steiner_tree(G, terminals, method='mehlhorn')
+    kou = steiner_tree(G, terminals, method='kou')
+
+    assert nx.is_tree(T)
+    assert set(terminals) <= set(T)
+    # both are within 2 - 2/t of the optimum, so within 2x of each other
+    assert T.size(weight='weight') <= 2 * kou.size(weight='weight')
+
+
+def test_pooled_closure_matches_serial():
+    G = random_graph(n=120)
+    terminals = list(G)[::4]
+
+    serial = closure_matrix(G, terminals=terminals)
+    pooled = closure_matrix(G, terminals=terminals, workers=2)
+
+    numpy.testing.assert_array_equal(pooled.distance, serial.distance)
+    for a, b in zip(pooled.pred, serial.pred):
+        numpy.testing.assert_array_equal(a, b)
+    assert edge_set(steiner_tree(G, terminals, workers=2)) == edge_set(steiner_tree(G, terminals))
+
+
+def test_dijkstra_stops_at_last_terminal():
+    G = nx.path_graph(100)
+    nx.set_edge_attributes(G, 1.0, 'weight')
+
+    distance, pred = _dijkstra(G, 50, [48, 53], 'weight')
+
+    # settles outwards from 50 and stops once 53 is settled
+    assert max(distance.values()) == 3
+    assert set(distance) == set(range(47, 54))
+    assert all(node in pred for node in distance)
+
+
+def test_closure_restricted_to_terminals():
+    G = random_graph()
+    terminals = list(G)[:6]
+
+    closure = closure_matrix(G, terminals=terminals)
+    full = closure_matrix(G)
+
+    assert closure.distance.shape == (6, 6)
+    rows = [full.index[t] for t in terminals]
+    numpy.testing.assert_allclose(closure.distance, full.distance[numpy.ix_(rows, rows)])
+
+
+def batch_count(cache, key):
+    return len([name for name in os.listdir(os.path.join(cache.directory, key))
+                if name.endswith('.sources.npy')])
+
+
+def test_cache_hits_and_misses(tmp_path):
+    G = random_graph()
+    nodes = list(G)
+    cache = ClosureCache(str(tmp_path))
+    key = cache.fingerprint(G)
+
+    first = closure_matrix(G, terminals=nodes[:10], cache=cache)
+    assert batch_count(cache, key) == 1
+    expected = closure_matrix(G, terminals=nodes[:10])
+    numpy.testing.assert_allclose(first.distance, expected.distance)
+    assert all(first.path(u, v) == expected.path(u, v) for u in nodes[:10] for v in nodes[:10])
+
+    # all cached: nothing new is written
+    closure_matrix(G, terminals=nodes[2:8], cache=cache)
+    assert batch_count(cache, key) == 1
+
+    # only the missing terminals are computed, in one new batch
+    closure_matrix(G, terminals=nodes[5:15], cache=cache)
+    assert batch_count(cache, key) == 2
+    assert len(cache.rows(key)) == 15
+
+
+def test_cache_misses_after_weight_change(tmp_path):
+    G = random_graph()
+    terminals = list(G)[:10]
+    cache = ClosureCache(str(tmp_path))
+    closure_matrix(G, terminals=terminals, cache=cache)
+    old_key = cache.fingerprint(G)
+
+    u, v = next(iter(G.edges))
+    G.edges[u, v]['weight'] += 0.5
+    new_key = cache.fingerprint(G)
+    assert new_key != old_key
+    assert cache.rows(new_key) == {}
+
+    closure = closure_matrix(G, terminals=terminals, cache=cache)
+    numpy.testing.assert_allclose(closure.distance, closure_matrix(G, terminals=terminals).distance)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    graphs = [random_graph(seed=seed) for seed in range(3)]
+    cache = ClosureCache(str(tmp_path))
+    keys = []
+    for age, G in enumerate(graphs):
+        closure_matrix(G, terminals=list(G)[:5], cache=cache)
+        key = cache.fingerprint(G)
+        # oldest first, whatever the file system's timestamp resolution
+        os.utime(os.path.join(cache.directory, key), (age, age))
+        keys.append(key)
+
+    # using the oldest graph makes the middle one least recently used
+    cache.rows(keys[0])
+    cache.max_bytes = cache.size() - cache.size(keys[1])
+    cache.evict()
+
+    remaining = set(os.listdir(cache.directory))
+    assert remaining == {keys[0], keys[2]}